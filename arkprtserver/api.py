@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 import datetime
-import re
+import hmac
 import typing
 
 import aiohttp
@@ -11,35 +12,86 @@ import aiohttp.web
 import arkprts
 
 from . import app as app_module
+from . import export, gamedata, passthrough, readiness, responses, sanity, sessions
 
 __all__ = ("api_routes",)
 
 api_routes = aiohttp.web.RouteTableDef()
 
 
-def format_blackboard(string: str, blackboard: typing.Mapping[str, object]) -> str:
-    """Format an object that uses arknight's 'blackboard' templating."""
+def _cache_headers(request: aiohttp.web.Request, headers: typing.Mapping[str, str] | None = None) -> dict[str, str]:
+    """Get the headers of a conditional response, with the Cache-Control configured for its route."""
+    route = request.match_info.route.resource
+    cache_control = app_module.CACHE_CONTROL.get(route.canonical if route else "", "no-cache")
+    return {**(headers or {}), "Cache-Control": cache_control, "Vary": "Accept"}
 
-    def replacer(match: re.Match[str]) -> str:
-        key, frm = match[1], match[2]
-        value = str(blackboard.get(key, "0"))
-        if value.replace(".", "").isnumeric() and float(value).is_integer():
-            value = str(int(float(value)))
-        if frm and "%" in frm:
-            value = str(round(float(value) * 100)) + "%"
 
-        return value
+def _not_modified(
+    request: aiohttp.web.Request,
+    etag: str,
+    headers: typing.Mapping[str, str] | None = None,
+) -> aiohttp.web.Response | None:
+    """Respond with 304 if the request already has the response with an ETag."""
+    match = next((match for match in request.if_none_match or () if match.value in (etag, "*")), None)
+    if match is None:
+        return None
 
-    string = re.sub(r"{(.+?)(?:\:(.+?))?}", replacer, string)
-    # return re.sub(r"<([@$].+?|/)>", "", string)
-    return string
+    response = aiohttp.web.Response(status=304, headers=_cache_headers(request, headers))
+    # compressed responses carry a weak ETag, see `compression_middleware`
+    response.etag = aiohttp.ETag(value=etag, is_weak=match.is_weak)
+    return response
+
+
+async def respond(
+    request: aiohttp.web.Request,
+    data: typing.Any,
+    *,
+    size: int = 0,
+    status: int = 200,
+    headers: typing.Mapping[str, str] | None = None,
+    conditional: bool = False,
+    etag: str | None = None,
+) -> aiohttp.web.Response:
+    """Create a response in the format the client asked for, serialized off the event loop if it is large.
+
+    Size is the amount of rows such as players or operators, see `Offloader`.
+    Conditional responses carry an ETag and answer If-None-Match with 304.
+    The ETag is hashed from the encoded body, or from a given ETag of whatever the data was made from,
+    which lets 304 be answered before encoding.
+    """
+    format = responses.negotiate_format(request)
+    if format is None:
+        return aiohttp.web.json_response({"message": "Unsupported format"}, status=400)
+
+    if etag is not None:
+        etag, conditional = responses.etag(etag, format), True
+        if (not_modified := _not_modified(request, etag, headers)) is not None:
+            return not_modified
+
+    body = await app_module.offloader.run(responses.encode, data, format, size=size)
+    if conditional and etag is None:
+        etag = responses.etag(body, format)
+        if (not_modified := _not_modified(request, etag, headers)) is not None:
+            return not_modified
+
+    response = aiohttp.web.Response(
+        body=body,
+        status=status,
+        content_type=responses.CONTENT_TYPES[format],
+        headers=_cache_headers(request, headers) if conditional else headers,
+    )
+    if conditional:
+        response.etag = etag
+    else:
+        response.headers.add("Vary", "Accept")
+
+    return response
 
 
 @api_routes.get("/api/raw/search")
+@readiness.requires("network")
 async def search_raw(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
     """Search for users."""
-    client: arkprts.Client = request.app["client"]
-
     server = request.query.get("server", "en")
     if server not in ("en", "jp", "kr"):
         return aiohttp.web.json_response({"message": "Unsupported server"}, status=400)
@@ -47,59 +99,118 @@ async def search_raw(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse
     nickname, nicknumber = request.query.get("nickname"), request.query.get("nicknumber", "")
     if not nickname:
         return aiohttp.web.json_response({"message": "Missing 'nickname' param"}, status=400)
-    if "#" in nickname:
-        nickname, nicknumber = nickname.split("#", 1)
 
-    uid_data = await client.search_raw_player_ids(nickname, nicknumber, server=server)
-    data = await client.get_raw_friend_info([uid["uid"] for uid in uid_data["result"]], server=server)
-    users = data["friends"]
+    users = await app_module.search_raw_players(nickname, nicknumber, server=server)
 
     request.app["log_request"](request=request, users=users)
-    return aiohttp.web.json_response(users)
-
-
-@api_routes.get("/api/search")
-async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  # noqa: PLR0912, PLR0915, C901
-    """Search for players but with data."""
+    return await respond(request, users, size=len(users))
+
+
+Fields = typing.Mapping[str, typing.Optional["Fields"]]
+"""Requested fields of a response by key. Subfields of None are all requested."""
+
+PLAYER_FIELDS = (
+    "nickname",
+    "nicknumber",
+    "uid",
+    "server",
+    "level",
+    "avatar",
+    "supports",
+    "lastonline",
+    "medals",
+    "registration",
+    "progression",
+    "characters",
+    "furniture",
+    "assistant",
+    "bio",
+    "factions",
+    "clues",
+)
+"""Top-level fields of a serialized player."""
+
+
+def parse_fields(param: str | None) -> Fields | None:
+    """Parse a comma-separated list of dotted field paths such as `supports.skills,assistant`."""
+    if not param:
+        return None
+
+    fields: dict[str, typing.Any] = {}
+    for path in param.split(","):
+        parts = [part for part in path.strip().split(".") if part]
+        node = fields
+        for i, part in enumerate(parts):
+            if part in node and node[part] is None:
+                break  # the whole field was already requested
+            if i == len(parts) - 1:
+                node[part] = None
+            else:
+                node = node.setdefault(part, {})
+
+    return fields
+
+
+def _get_fields(request: aiohttp.web.Request) -> Fields | aiohttp.web.Response | None:
+    """Get the requested player fields of a request."""
+    fields = parse_fields(request.query.get("fields"))
+    if fields is not None and (unknown := [field for field in fields if field not in PLAYER_FIELDS]):
+        return aiohttp.web.json_response({"message": f"Unknown fields: {', '.join(unknown)}"}, status=400)
+
+    return fields
+
+
+def _wants(fields: Fields | None, name: str) -> bool:
+    """Whether a field was requested."""
+    return fields is None or name in fields
+
+
+def _subfields(fields: Fields | None, name: str) -> Fields | None:
+    """Get the requested subfields of a field."""
+    return None if fields is None else fields.get(name)
+
+
+def _project(data: typing.Any, fields: Fields | None) -> typing.Any:
+    """Drop everything that was not requested."""
+    if fields is None:
+        return data
+    if isinstance(data, list):
+        return [_project(item, fields) for item in data]  # pyright: ignore[reportUnknownVariableType]
+    if isinstance(data, dict):
+        return {key: _project(value, fields[key]) for key, value in data.items() if key in fields}  # pyright: ignore
+
+    return data
+
+
+def serialize_player(  # noqa: PLR0912, PLR0915, C901
+    user: arkprts.models.Player,
+    client: arkprts.Client,
+    lang_index: gamedata.LanguageIndex,
+    fields: Fields | None = None,
+) -> typing.Any:
+    """Turn a player into pretty data, only building the requested fields."""
     # help this is way too damn complex
-    client: arkprts.Client = request.app["client"]
-
-    server = request.query.get("server", "en")
-    if server not in ("en", "jp", "kr"):
-        return aiohttp.web.json_response({"message": "Unsupported server"}, status=400)
-
-    lang = request.query.get("lang", server)
-    if lang not in ("en", "jp", "kr", "cn"):
-        return aiohttp.web.json_response({"message": "Unsupported language"}, status=400)
-
-    nickname, nicknumber = request.query.get("nickname"), request.query.get("nicknumber", "")
-    if not nickname:
-        return aiohttp.web.json_response({"message": "Missing 'nickname' param"}, status=400)
-
-    users = await client.search_players(nickname, nicknumber, server=server)
-
-    return_data: typing.Any = []
-    for user in users:
-        user_data: typing.Any = {
-            "nickname": user.nickname,
-            "nicknumber": user.nick_number,
-            "uid": user.uid,
-            "server": user.server_name,
-            "level": user.level,
-            "avatar": ...,
-            "supports": ...,
-            "lastonline": user.last_online_time.astimezone(datetime.timezone.utc).isoformat(),
-            "medals": ...,
-            "registration": user.register_ts.astimezone(datetime.timezone.utc).isoformat(),
-            "progression": ...,
-            "characters": user.char_cnt,
-            "furniture": user.furn_cnt,
-            "assistant": ...,
-            "bio": user.resume,
-            "factions": ...,
-            "clues": ...,
-        }
+    user_data: typing.Any = {
+        "nickname": user.nickname,
+        "nicknumber": user.nick_number,
+        "uid": user.uid,
+        "server": user.server_name,
+        "level": user.level,
+        "avatar": ...,
+        "supports": ...,
+        "lastonline": user.last_online_time.astimezone(datetime.timezone.utc).isoformat(),
+        "medals": ...,
+        "registration": user.register_ts.astimezone(datetime.timezone.utc).isoformat(),
+        "progression": ...,
+        "characters": user.char_cnt,
+        "furniture": user.furn_cnt,
+        "assistant": ...,
+        "bio": user.resume,
+        "factions": ...,
+        "clues": ...,
+    }
 
+    if _wants(fields, "avatar"):
         if user.avatar:
             user_data["avatar"] = {
                 "type": user.avatar.type,
@@ -111,43 +222,30 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
         else:
             user_data["avatar"] = {"type": "DEFAULT", "id": None, "asset": None}
 
+    if _wants(fields, "supports"):
+        support_fields = _subfields(fields, "supports")
         user_data["supports"] = []
         for char in user.assist_char_list or []:
             if not char:
                 continue
 
-            char_data = client.assets.get_operator(char.char_id, server=lang)
-
-            en_class_name = {
-                "WARRIOR": "Guard",
-                "SNIPER": "Sniper",
-                "TANK": "Defender",
-                "MEDIC": "Medic",
-                "SUPPORT": "Supporter",
-                "CASTER": "Caster",
-                "SPECIAL": "Specialist",
-                "PIONEER": "Vanguard",
-            }[char_data.profession]
-
-            team = client.assets.get_excel("handbook_team_table", server=lang)
+            view = lang_index.get_operator(char.char_id)
             support: typing.Any = {
-                "id": char.char_id,
-                "name": char_data.name,
-                "nation": team[char_data.nation_id].power_name if char_data.get("nation_id") else None,
-                "team": team[char_data.team_id].power_name if char_data.get("team_id") else None,
-                "number": char_data.display_number,
-                "rarity": char_data.rarity[-1],
+                "id": view.id,
+                "name": view.name,
+                "nation": view.nation,
+                "team": view.team,
+                "number": view.number,
+                "rarity": view.rarity,
                 "class": {
-                    "id": char_data.profession,
-                    "name": en_class_name,
-                    "asset": app_module.get_image("classes", "class_" + en_class_name.lower()),
+                    "id": view.profession,
+                    "name": view.class_name,
+                    "asset": view.class_asset,
                 },
                 "archetype": {
-                    "id": char_data.sub_profession_id,
-                    "name": client.assets.get_excel("uniequip_table", server=lang)
-                    .sub_prof_dict[char_data.sub_profession_id]
-                    .sub_profession_name,
-                    "asset": app_module.get_image("ui/subclass", "sub_" + char_data.sub_profession_id + "_icon"),
+                    "id": view.archetype_id,
+                    "name": view.archetype_name,
+                    "asset": view.archetype_asset,
                 },
                 "skin": {
                     "id": char.skin_id,
@@ -173,68 +271,60 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
                 "talents": [],
             }
 
-            for index, skill in enumerate(char.skills):
-                lv = char.main_skill_lvl + skill.specialize_level - 1
-                skill_data = client.assets.get_excel("skill_table", server=lang)[skill.skill_id]["levels"][lv]
-                skill = {
-                    "id": skill.skill_id,
-                    "name": skill_data.name,
-                    "description": format_blackboard(skill_data.description, skill_data.blackboard),
-                    "sp": {
-                        "type": skill_data.sp_data.sp_type,
-                        "cost": skill_data.sp_data.sp_cost,
-                    },
-                    "asset": app_module.get_image(
-                        "skills",
-                        "skill_icon_" + (skill.static.get("icon_id") or skill.skill_id),
-                    ),
-                    "unlocked": skill.unlock,
-                    "level": char.main_skill_lvl,
-                    "mastery": skill.specialize_level,
-                    "selected": index == char.skill_index,
-                }
-                support["skills"]["skills"].append(skill)
-
-            for module_id, module in char.equip.items():
-                module_data = client.assets.get_module(module_id, server=lang)
-                module = {
-                    "id": module_id,
-                    "name": module_data.uni_equip_name,
-                    "level": module.level,
-                    "type": {
-                        "name": module_data.type_icon.upper(),
-                        "name1": module_data.type_name1,
-                        "name2": module_data.get("type_name2"),
-                        "asset": app_module.get_image("equip/type", module_data.type_icon),
-                    },
-                    "asset": app_module.get_image("equip/icon", module_id),
-                    "hidden": module.hide,
-                    "locked": module.locked,
-                    "selected": module_id == char.current_equip,
-                }
-                support["modules"]["modules"].append(module)
-
-            for talent_c in char_data.talents:
-                candidate = next(
-                    (
-                        candidate
-                        for candidate in reversed(talent_c.candidates)
-                        if candidate.required_potential_rank <= char.potential_rank
-                        and int(candidate.unlock_condition.phase[-1]) <= char.evolve_phase
-                    ),
-                    None,
-                )
-                if candidate is None:
-                    continue
-
-                talent = {
-                    "name": candidate.name,
-                    "description": format_blackboard(candidate.description, candidate.blackboard),
-                }
-                support["talents"].append(talent)
+            if _wants(support_fields, "skills"):
+                for index, skill in enumerate(char.skills):
+                    lv = char.main_skill_lvl + skill.specialize_level - 1
+                    skill_data = lang_index.skills[skill.skill_id].levels[lv]
+                    skill = {
+                        "id": skill.skill_id,
+                        "name": skill_data.name,
+                        "description": lang_index.describe_skill(skill.skill_id, lv),
+                        "sp": {
+                            "type": skill_data.sp_data.sp_type,
+                            "cost": skill_data.sp_data.sp_cost,
+                        },
+                        "asset": app_module.get_image(
+                            "skills",
+                            "skill_icon_" + (skill.static.get("icon_id") or skill.skill_id),
+                        ),
+                        "unlocked": skill.unlock,
+                        "level": char.main_skill_lvl,
+                        "mastery": skill.specialize_level,
+                        "selected": index == char.skill_index,
+                    }
+                    support["skills"]["skills"].append(skill)
+
+            if _wants(support_fields, "modules"):
+                for module_id, module in char.equip.items():
+                    module_data = client.assets.get_module(module_id, server=lang_index.server)  # type: ignore
+                    module = {
+                        "id": module_id,
+                        "name": module_data.uni_equip_name,
+                        "level": module.level,
+                        "type": {
+                            "name": module_data.type_icon.upper(),
+                            "name1": module_data.type_name1,
+                            "name2": module_data.get("type_name2"),
+                            "asset": app_module.get_image("equip/type", module_data.type_icon),
+                        },
+                        "asset": app_module.get_image("equip/icon", module_id),
+                        "hidden": module.hide,
+                        "locked": module.locked,
+                        "selected": module_id == char.current_equip,
+                    }
+                    support["modules"]["modules"].append(module)
+
+            if _wants(support_fields, "talents"):
+                for candidate in view.unlocked_talents(char.potential_rank, char.evolve_phase):
+                    talent = {
+                        "name": candidate.name,
+                        "description": candidate.description,
+                    }
+                    support["talents"].append(talent)
 
             user_data["supports"].append(support)
 
+    if _wants(fields, "medals"):
         if user.medal_board.custom:
             user_data["medals"] = {
                 "type": user.medal_board.type,
@@ -242,10 +332,7 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
                 "medals": [],
             }
             for medal in user.medal_board.custom.layout:
-                # static_medal = client.assets.get_medal(medal.id, server=lang)
-                static_medal = next(
-                    m for m in client.assets.get_excel("medal_table", server=lang).medal_list if m.medal_id == medal.id
-                )
+                static_medal = lang_index.medals[medal.id]
                 user_data["medals"]["medals"].append(
                     {
                         "id": medal.id,
@@ -257,12 +344,7 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
                     },
                 )
         elif user.medal_board.template:
-            medal_group = next(
-                medal_group
-                for groups in client.assets.get_excel("medal_table", server=lang).medal_type_data.values()
-                for medal_group in groups.group_data
-                if medal_group.group_id == user.medal_board.template.group_id
-            )
+            medal_group = lang_index.medal_groups[user.medal_board.template.group_id]
             user_data["medals"] = {
                 "type": user.medal_board.type,
                 "template": {
@@ -274,9 +356,7 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
                 "medals": [],
             }
             for medal in user.medal_board.template.medal_list:
-                static_medal = next(
-                    m for m in client.assets.get_excel("medal_table", server=lang).medal_list if m.medal_id == medal
-                )
+                static_medal = lang_index.medals[medal]
                 user_data["medals"]["medals"].append(
                     {
                         "id": medal,
@@ -294,8 +374,10 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
                 "medals": [],
             }
 
+    if _wants(fields, "progression"):
         if user.main_stage_progress:
-            stage = client.assets.get_excel("stage_table", server=lang).stages[user.main_stage_progress]
+            stage_table = client.assets.get_excel("stage_table", server=lang_index.server)  # type: ignore
+            stage = stage_table.stages[user.main_stage_progress]
             user_data["progression"] = {
                 "id": user.main_stage_progress,
                 "code": stage.code,
@@ -306,7 +388,8 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
         else:
             user_data["progression"] = {"id": None, "code": None, "name": None, "level": None, "type": "COMPLETED"}
 
-        assistant = client.assets.get_operator(user.secretary, server=lang)
+    if _wants(fields, "assistant"):
+        assistant = client.assets.get_operator(user.secretary, server=lang_index.server)  # type: ignore
         if assistant:  # null for new accounts
             user_data["assistant"] = {
                 "id": user.secretary,
@@ -319,9 +402,10 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
         else:
             user_data["assistant"] = {"id": None, "name": None, "skin": {"id": None, "asset": None}}
 
+    if _wants(fields, "factions"):
         user_data["factions"] = []
         for team, count in user.team_v2.items():
-            faction = client.assets.get_excel("handbook_team_table", server=lang)[team]
+            faction = lang_index.teams[team]
             user_data["factions"].append(
                 {
                     "id": team,
@@ -332,12 +416,11 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
                 },
             )
 
+    if _wants(fields, "clues"):
         user_data["clues"] = []
         for board in user.board:
-            clue = next(i for i in client.assets.get_excel("clue_data", server=lang).clues if i.clue_type == board)
-            clue_type = next(
-                i for i in client.assets.get_excel("clue_data", server=lang).clue_types if i.clue_type == board
-            )
+            clue = lang_index.clues[board]
+            clue_type = lang_index.clue_types[board]
             user_data["clues"].append(
                 {
                     "id": board,
@@ -346,13 +429,194 @@ async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:  #
                 },
             )
 
-        return_data.append(user_data)
+    return _project(user_data, fields)
+
+
+def serialize_players(
+    users: typing.Iterable[arkprts.models.Player],
+    client: arkprts.Client,
+    lang_index: gamedata.LanguageIndex,
+    fields: Fields | None = None,
+) -> list[typing.Any]:
+    """Turn many players into pretty data."""
+    return [serialize_player(user, client, lang_index, fields) for user in users]
+
+
+@api_routes.get("/api/search")
+@readiness.requires("gamedata")
+async def search(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Search for players but with data."""
+    client: arkprts.Client = request.app["client"]
+
+    server = request.query.get("server", "en")
+    if server not in ("en", "jp", "kr"):
+        return aiohttp.web.json_response({"message": "Unsupported server"}, status=400)
+
+    lang = request.query.get("lang", server)
+    if lang not in ("en", "jp", "kr", "cn"):
+        return aiohttp.web.json_response({"message": "Unsupported language"}, status=400)
+
+    nickname, nicknumber = request.query.get("nickname"), request.query.get("nicknumber", "")
+    if not nickname:
+        return aiohttp.web.json_response({"message": "Missing 'nickname' param"}, status=400)
+
+    fields = _get_fields(request)
+    if isinstance(fields, aiohttp.web.Response):
+        return fields
+
+    raw_users = await app_module.search_raw_players(nickname, nicknumber, server=server)
+    etag = responses.etag(
+        responses.dumps_json(raw_users),
+        lang,
+        request.query.get("fields", ""),
+        str(app_module.refresh_status["version"]),
+    )
+    format = responses.negotiate_format(request)
+    if format and (not_modified := _not_modified(request, responses.etag(etag, format))) is not None:
+        return not_modified
+
+    users = app_module.to_player_models(raw_users)
+    lang_index = await app_module.use_language(lang)
+
+    return_data = await app_module.offloader.run_in_thread(
+        serialize_players,
+        users,
+        client,
+        lang_index,
+        fields,
+        size=len(users),
+    )
+
+    request.app["log_request"](request=request, users=return_data)
+    return await respond(request, return_data, size=len(return_data), etag=etag)
+
+
+MAX_BATCH_PLAYERS = 100
+"""Maximum amount of nicknames and uids in a single batch request."""
+
+
+def _get_player_batch(request: aiohttp.web.Request) -> tuple[list[str], list[str]] | aiohttp.web.Response:
+    """Get the nicknames and uids of a batch request."""
+    nicknames = [nickname for nickname in request.query.getall("nickname", []) if nickname]
+    uids = [uid for param in request.query.getall("uid", []) for uid in param.split(",") if uid]
+    if not nicknames and not uids:
+        return aiohttp.web.json_response({"message": "Missing 'nickname' or 'uid' param"}, status=400)
+    if any(not uid.isdigit() for uid in uids):
+        return aiohttp.web.json_response({"message": "Invalid 'uid' param"}, status=400)
+    if len(nicknames) + len(uids) > MAX_BATCH_PLAYERS:
+        return aiohttp.web.json_response({"message": f"At most {MAX_BATCH_PLAYERS} players are allowed"}, status=400)
+
+    return nicknames, uids
+
+
+@api_routes.get("/api/raw/players")
+@readiness.requires("network")
+async def players_raw(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Get many users by nickname or uid at once."""
+    server = request.query.get("server", "en")
+    if server not in ("en", "jp", "kr"):
+        return aiohttp.web.json_response({"message": "Unsupported server"}, status=400)
+
+    batch = _get_player_batch(request)
+    if isinstance(batch, aiohttp.web.Response):
+        return batch
+
+    users = await app_module.get_raw_players_batch(*batch, server=server)
+
+    request.app["log_request"](request=request, users=users)
+    return await respond(request, users, size=len(users))
+
+
+@api_routes.get("/api/players")
+@readiness.requires("gamedata")
+async def players(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Get many users by nickname or uid at once but with data."""
+    client: arkprts.Client = request.app["client"]
+
+    server = request.query.get("server", "en")
+    if server not in ("en", "jp", "kr"):
+        return aiohttp.web.json_response({"message": "Unsupported server"}, status=400)
+
+    lang = request.query.get("lang", server)
+    if lang not in ("en", "jp", "kr", "cn"):
+        return aiohttp.web.json_response({"message": "Unsupported language"}, status=400)
+
+    batch = _get_player_batch(request)
+    if isinstance(batch, aiohttp.web.Response):
+        return batch
+
+    fields = _get_fields(request)
+    if isinstance(fields, aiohttp.web.Response):
+        return fields
+
+    users = app_module.to_player_models(await app_module.get_raw_players_batch(*batch, server=server))
+    lang_index = await app_module.use_language(lang)
+
+    return_data = await app_module.offloader.run_in_thread(
+        serialize_players,
+        users,
+        client,
+        lang_index,
+        fields,
+        size=len(users),
+    )
 
     request.app["log_request"](request=request, users=return_data)
-    return aiohttp.web.json_response(return_data)
+    return await respond(request, return_data, size=len(return_data))
+
+
+@api_routes.get("/api/stats")
+@readiness.requires()
+async def stats(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Get internal cache statistics."""
+    indexes: gamedata.GamedataIndexes = request.app["indexes"]
+    return aiohttp.web.json_response(
+        {
+            "blackboard": indexes.blackboards.stats(),
+            "search": app_module.search_cache.stats(),
+            "export": app_module.export_cache.stats(),
+            "images": app_module.images.urls.stats(),
+            "pages": app_module.page_cache.stats(),
+            "sanity": app_module.sanity_streams.stats(),
+            "sessions": app_module.session_pool.stats(),
+            "guests": app_module.guest_pool.stats(),
+            "languages": sorted(app_module.loaded_languages),
+            "offload": app_module.offloader.stats(),
+            "loop_lag": app_module.loop_lag.stats(),
+        },
+    )
+
+
+def _is_admin(request: aiohttp.web.Request) -> bool:
+    """Check whether a request carries the admin token."""
+    token = app_module.ADMIN_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+
+@api_routes.post("/admin/reload")
+@readiness.requires("gamedata")
+async def admin_reload(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Refresh gamedata now and return the outcome."""
+    if not _is_admin(request):
+        return aiohttp.web.json_response({"message": "Forbidden"}, status=403)
+
+    force = request.query.get("force", "").lower() in ("true", "1")
+    status = await app_module.refresh_gamedata(request.app, force=force)
+    return aiohttp.web.json_response(status, status=500 if status["error"] else 200)
+
+
+@api_routes.get("/admin/status")
+@readiness.requires()
+async def admin_status(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Get the outcome of the last gamedata refresh."""
+    if not _is_admin(request):
+        return aiohttp.web.json_response({"message": "Forbidden"}, status=403)
+
+    return aiohttp.web.json_response({**app_module.refresh_status, "interval": app_module.REFRESH_INTERVAL})
 
 
 @api_routes.get("/api/login/sendcode")
+@readiness.requires("network")
 async def login_sendcode(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
     """Send an email code."""
     server = request.query.get("server", "en")
@@ -375,6 +639,7 @@ async def login_sendcode(request: aiohttp.web.Request) -> aiohttp.web.StreamResp
 
 
 @api_routes.get("/api/login")
+@readiness.requires("network")
 async def login(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
     """Send an email code."""
     server = request.query.get("server", "en")
@@ -407,9 +672,8 @@ def get_any(k: str, ds: typing.Collection[typing.Mapping[str, str]]) -> str | No
     return next(filter(None, (d.get(k) for d in ds)), None)
 
 
-@api_routes.get("/api/raw/user")
-async def raw_user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
-    """Get raw user data."""
+async def _get_auth(request: aiohttp.web.Request) -> arkprts.Auth | aiohttp.web.Response:
+    """Get a pooled session from the authentication of a request."""
     ds = (request.query, request.headers, request.cookies)
     server = get_any("server", ds) or "en"
     if server not in ("en", "jp", "kr", "cn", "bili", "tw"):
@@ -418,68 +682,157 @@ async def raw_user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
     channel_uid, token = get_any("channeluid", ds), get_any("token", ds)
     uid, secret, seqnum = get_any("uid", ds), get_any("secret", ds), get_any("seqnum", ds)
     if uid and secret and seqnum and seqnum.isdigit():
-        auth = await arkprts.Auth.from_session(
-            server,
-            uid=uid,
-            secret=secret,
-            seqnum=seqnum,
-            network=request.app["client"].network,
-        )
-    elif channel_uid and token:
-        auth = await arkprts.Auth.from_token(
-            server,
-            channel_uid=channel_uid,
-            token=token,
-            network=request.app["client"].network,
-        )
-    else:
-        return aiohttp.web.json_response({"message": "Insufficient authentication"}, status=403)
+        return app_module.session_pool.from_session(server, uid=uid, secret=secret, seqnum=seqnum)
+    if channel_uid and token:
+        return await app_module.session_pool.login_with_token(server, channel_uid, token)
 
-    client = arkprts.Client(auth, assets=False)
+    return aiohttp.web.json_response({"message": "Insufficient authentication"}, status=403)
 
-    data = await client.get_raw_data()
 
-    headers = {
+def _session_headers(auth: arkprts.Auth) -> dict[str, str]:
+    """Get the headers needed to resume a session."""
+    return {
         "uid": auth.session.uid,
         "secret": auth.session.secret,
         "seqnum": str(auth.session.seqnum),
     }
+
+
+@api_routes.get("/api/raw/user")
+@readiness.requires("network")
+async def raw_user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Get raw user data."""
+    auth = await _get_auth(request)
+    if isinstance(auth, aiohttp.web.Response):
+        return auth
+
+    if app_module.RAW_PASSTHROUGH:
+        return await _raw_user_passthrough(request, auth)
+
+    client = arkprts.Client(auth, assets=False)
+
+    try:
+        data = await client.get_raw_data()
+    except arkprts.errors.BaseArkprtsError as e:
+        app_module.session_pool.check(auth, e)
+        raise
+
+    headers = _session_headers(auth)
     request.app["log_request"](request=request, user=data["user"])
-    return aiohttp.web.json_response(data["user"], headers=headers)
+    size = len(data["user"].get("troop", {}).get("chars", ()))
+    return await respond(request, data["user"], size=size, headers=headers, conditional=True)
+
+
+async def _raw_user_passthrough(request: aiohttp.web.Request, auth: arkprts.Auth) -> aiohttp.web.StreamResponse:
+    """Get raw user data, slicing json out of the upstream body instead of decoding it."""
+    try:
+        upstream = await passthrough.auth_request(auth, "account/syncData", json={"platform": 1})
+        sliced = passthrough.slice_member(upstream.body, "user") if upstream.data is None else None
+        passthrough.check_errors(upstream.status, sliced[1] if sliced else upstream.decode())
+    except arkprts.errors.BaseArkprtsError as e:
+        app_module.session_pool.check(auth, e)
+        raise
+
+    headers = _session_headers(auth)
+    etag = responses.etag(sliced[0]) if sliced else None
+    if etag is not None and responses.negotiate_format(request) == "json":
+        request.app["log_request"](request=request, raw_user=sliced[0])
+        json_etag = responses.etag(etag, "json")
+        if (not_modified := _not_modified(request, json_etag, headers)) is not None:
+            return not_modified
+
+        response = aiohttp.web.Response(
+            body=sliced[0],
+            content_type="application/json",
+            headers=_cache_headers(request, headers),
+        )
+        response.etag = json_etag
+        return response
+
+    data = upstream.decode()
+    request.app["log_request"](request=request, user=data["user"])
+    size = len(data["user"].get("troop", {}).get("chars", ()))
+    return await respond(request, data["user"], size=size, headers=headers, conditional=True, etag=etag)
+
+
+EXPORT_CONTENT_TYPES: typing.Mapping[str, str] = {
+    "krooster-operators": "application/json",
+    "krooster-items": "text/csv",
+    "penguin": "application/json",
+}
+"""Content types of the export formats."""
+
+
+def serialize_exports(
+    user: arkprts.models.User,
+    characters: typing.Mapping[str, typing.Any],
+) -> typing.Mapping[str, bytes]:
+    """Export user data to every format at once and serialize it."""
+    exports = export.export_all(user, characters)
+    return {
+        name: data.encode() if isinstance(data, str) else responses.dumps_json(data) for name, data in exports.items()
+    }
+
+
+@api_routes.get("/api/export/{format}")
+@readiness.requires("gamedata")
+async def export_user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Export user data to krooster or penguin statistics."""
+    export_format = request.match_info["format"]
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return aiohttp.web.json_response({"message": "Unknown export format"}, status=400)
+
+    auth = await _get_auth(request)
+    if isinstance(auth, aiohttp.web.Response):
+        return auth
+
+    global_client: arkprts.Client = request.app["client"]
+    client = arkprts.Client(auth, assets=global_client.assets, network=global_client.network)
+    server = global_client.assets.default_server or "en"
+
+    async def fetch() -> typing.Mapping[str, bytes]:
+        try:
+            user = await client.get_data()
+        except arkprts.errors.BaseArkprtsError as e:
+            app_module.session_pool.check(auth, e)
+            raise
+
+        characters = app_module.indexes.user_page(server).characters
+        return await app_module.offloader.run_in_thread(
+            serialize_exports,
+            user,
+            characters,
+            size=len(user.troop.chars),
+        )
+
+    # the secret is part of the key so only holders of the session get the cached export
+    key = (auth.server, auth.session.uid, auth.session.secret, str(app_module.refresh_status["version"]))
+    exports = await app_module.export_cache.fetch(key, fetch)
+
+    headers = _session_headers(auth)
+    return aiohttp.web.Response(
+        body=exports[export_format],
+        content_type=EXPORT_CONTENT_TYPES[export_format],
+        headers=headers,
+    )
 
 
 @api_routes.get("/api/user")
+@readiness.requires("gamedata")
 async def user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
     """Get parsed user data."""
-    ds = (request.query, request.headers, request.cookies)
-    server = get_any("server", ds) or "en"
-    if server not in ("en", "jp", "kr", "cn", "bili", "tw"):
-        return aiohttp.web.json_response({"message": "Unsupported server"}, status=400)
-
-    channel_uid, token = get_any("channeluid", ds), get_any("token", ds)
-    uid, secret, seqnum = get_any("uid", ds), get_any("secret", ds), get_any("seqnum", ds)
-    if uid and secret and seqnum and seqnum.isdigit():
-        auth = await arkprts.Auth.from_session(
-            server,
-            uid=uid,
-            secret=secret,
-            seqnum=seqnum,
-            network=request.app["client"].network,
-        )
-    elif channel_uid and token:
-        auth = await arkprts.Auth.from_token(
-            server,
-            channel_uid=channel_uid,
-            token=token,
-            network=request.app["client"].network,
-        )
-    else:
-        return aiohttp.web.json_response({"message": "Insufficient authentication"}, status=403)
+    auth = await _get_auth(request)
+    if isinstance(auth, aiohttp.web.Response):
+        return auth
 
     global_client: arkprts.Client = request.app["client"]
     client = arkprts.Client(auth, assets=global_client.assets, network=global_client.network)
 
-    data = await client.get_data()
+    try:
+        data = await client.get_data()
+    except arkprts.errors.BaseArkprtsError as e:
+        app_module.session_pool.check(auth, e)
+        raise
 
     return_data = {
         "user": {
@@ -487,13 +840,12 @@ async def user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
             "nicknumber": data.status.nick_number,
             "level": data.status.level,
             "exp": data.status.exp,
-            "uid": uid,
-            "sanity": {
-                "current": data.status.current_ap,
-                "max": data.status.max_ap,
-                "last": data.status.ap,
-                "lastupdate": data.status.last_ap_add_time.astimezone(datetime.timezone.utc).isoformat(),
-            },
+            "uid": auth.session.uid,
+            "sanity": sanity.Sanity(
+                data.status.ap,
+                data.status.max_ap,
+                data.status.last_ap_add_time.astimezone(datetime.timezone.utc),
+            ).to_dict(datetime.datetime.now(tz=datetime.timezone.utc)),
             "lastonline": data.status.last_online_ts.astimezone(datetime.timezone.utc).isoformat(),
             "registration": data.status.register_ts.astimezone(datetime.timezone.utc).isoformat(),
             "progression": {"id": data.status.main_stage_progress},
@@ -502,60 +854,205 @@ async def user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
         },
     }
 
-    headers = {
-        "uid": auth.session.uid,
-        "secret": auth.session.secret,
-        "seqnum": str(auth.session.seqnum),
-    }
+    headers = _session_headers(auth)
     request.app["log_request"](request=request, user=return_data)
-    return aiohttp.web.json_response(return_data, headers=headers)
+    return await respond(request, return_data, headers=headers, conditional=True)
 
 
-@api_routes.post(r"/proxy/{endpoint:.+}")
-async def proxy(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
-    ds = (request.query, request.headers, request.cookies)
-    server = get_any("server", ds) or "en"
-    if server not in ("en", "jp", "kr", "cn", "bili", "tw"):
-        return aiohttp.web.json_response({"message": "Unsupported server"}, status=400)
+async def _sync_sanity(auth: arkprts.Auth) -> sanity.Sanity:
+    """Get the sanity of a session from the game server."""
+    try:
+        data = await auth.auth_request("account/syncData", json={"platform": 1})
+    except arkprts.errors.BaseArkprtsError as e:
+        app_module.session_pool.check(auth, e)
+        raise
 
-    channel_uid, token = get_any("channeluid", ds), get_any("token", ds)
-    uid, secret, seqnum = get_any("uid", ds), get_any("secret", ds), get_any("seqnum", ds)
-    if uid and secret and seqnum and seqnum.isdigit():
-        auth = await arkprts.Auth.from_session(
-            server,
-            uid=uid,
-            secret=secret,
-            seqnum=seqnum,
-            network=request.app["client"].network,
-        )
-    elif channel_uid and token:
-        auth = await arkprts.Auth.from_token(
-            server,
-            channel_uid=channel_uid,
-            token=token,
-            network=request.app["client"].network,
-        )
-    else:
-        return aiohttp.web.json_response({"message": "Insufficient authentication"}, status=403)
+    return sanity.Sanity.from_raw(data["user"]["status"])
 
-    if request.query.get("sync", "").lower() in ("true", "1"):
-        await auth.auth_request("account/syncData", json={"platform": 1})
-        await auth.auth_request(
-            "account/syncStatus",
-            json={
-                "modules": 7,
-                "params": {
-                    "16": {"goodIdMap": {"LS": [], "HS": [], "ES": [], "CASH": [], "GP": ["GP_Once_1"], "SOCIAL": []}},
-                },
+
+def _sanity_message(auth: arkprts.Auth, update: tuple[str, typing.Any]) -> tuple[str, typing.Any]:
+    """Get the event and data of a sanity stream update, syncs send the new session headers."""
+    event, data = update
+    if event == "sync":
+        return "session", _session_headers(auth)
+
+    return event, data
+
+
+async def _sanity_events(
+    request: aiohttp.web.Request,
+    auth: arkprts.Auth,
+    stream: sanity.SanityStream,
+) -> aiohttp.web.StreamResponse:
+    """Push sanity updates as server-sent events."""
+    response = aiohttp.web.StreamResponse(headers={**_session_headers(auth), "Cache-Control": "no-cache"})
+    response.content_type = "text/event-stream"
+    await response.prepare(request)
+
+    try:
+        try:
+            async for update in stream.updates():
+                if update is None:
+                    await response.write(b": heartbeat\n\n")
+                    continue
+
+                event, data = _sanity_message(auth, update)
+                await response.write(b"event: " + event.encode() + b"\ndata: " + responses.dumps_json(data) + b"\n\n")
+        except arkprts.errors.BaseArkprtsError as e:
+            await response.write(b"event: error\ndata: " + responses.dumps_json({"message": str(e)}) + b"\n\n")
+    except ConnectionResetError:  # the client went away
+        pass
+
+    return response
+
+
+async def _sanity_websocket(
+    request: aiohttp.web.Request,
+    websocket: aiohttp.web.WebSocketResponse,
+    auth: arkprts.Auth,
+    stream: sanity.SanityStream,
+) -> aiohttp.web.WebSocketResponse:
+    """Push sanity updates over a websocket, the client may send "sync" to sync with the game server."""
+    await websocket.prepare(request)
+
+    async def receive() -> None:
+        async for message in websocket:
+            if message.type == aiohttp.WSMsgType.TEXT and message.data == "sync":
+                stream.request_sync()
+
+        stream.close()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        async for update in stream.updates():
+            if update is not None:
+                event, data = _sanity_message(auth, update)
+                await websocket.send_str(responses.dumps_json({"event": event, "data": data}).decode())
+    except arkprts.errors.BaseArkprtsError as e:
+        await websocket.send_str(responses.dumps_json({"event": "error", "data": {"message": str(e)}}).decode())
+    except ConnectionResetError:
+        pass
+    finally:
+        receiver.cancel()
+        await websocket.close()
+
+    return websocket
+
+
+@api_routes.get("/api/user/sanity")
+@readiness.requires("network")
+async def user_sanity(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Stream sanity as it regenerates, computed locally and only synced with the game server on an interval."""
+    auth = await _get_auth(request)
+    if isinstance(auth, aiohttp.web.Response):
+        return auth
+
+    current = await _sync_sanity(auth)
+    stream = app_module.sanity_streams.open(current, lambda: _sync_sanity(auth))
+    try:
+        websocket = aiohttp.web.WebSocketResponse(heartbeat=stream.heartbeat)
+        if websocket.can_prepare(request):
+            return await _sanity_websocket(request, websocket, auth, stream)
+
+        return await _sanity_events(request, auth, stream)
+    finally:
+        app_module.sanity_streams.discard(stream)
+
+
+async def _sync(auth: arkprts.Auth) -> None:
+    """Send the sync requests the game client sends on login."""
+    await auth.auth_request("account/syncData", json={"platform": 1})
+    await auth.auth_request(
+        "account/syncStatus",
+        json={
+            "modules": 7,
+            "params": {
+                "16": {"goodIdMap": {"LS": [], "HS": [], "ES": [], "CASH": [], "GP": ["GP_Once_1"], "SOCIAL": []}},
             },
+        },
+    )
+
+
+MAX_BATCH_PROXY = 20
+"""Maximum amount of requests in a single proxy batch."""
+
+
+@api_routes.post("/proxy/batch")
+@readiness.requires("network")
+async def proxy_batch(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Proxy many requests in order over a single session."""
+    try:
+        batch = await request.json()
+    except ValueError:
+        return aiohttp.web.json_response({"message": "Invalid json body"}, status=400)
+
+    if (
+        not isinstance(batch, list)
+        or not batch
+        or not all(isinstance(item, dict) and isinstance(item.get("endpoint"), str) for item in batch)
+    ):
+        return aiohttp.web.json_response(
+            {"message": "Body must be a list of {'endpoint': ..., 'payload': ...} objects"},
+            status=400,
         )
+    if len(batch) > MAX_BATCH_PROXY:
+        return aiohttp.web.json_response({"message": f"At most {MAX_BATCH_PROXY} requests are allowed"}, status=400)
 
-    data = await auth.auth_request(request.match_info["endpoint"], json=await request.json(), handle_errors=False)
+    auth = await _get_auth(request)
+    if isinstance(auth, aiohttp.web.Response):
+        return auth
 
-    headers = {
-        "uid": auth.session.uid,
-        "secret": auth.session.secret,
-        "seqnum": str(auth.session.seqnum),
-    }
+    if request.query.get("sync", "").lower() in ("true", "1"):
+        await _sync(auth)
+
+    results: list[typing.Any] = []
+    for item in batch:
+        data = await auth.auth_request(item["endpoint"], json=item.get("payload", {}), handle_errors=False)
+        results.append(data)
+        if sessions.is_auth_error(data):
+            # every following request would fail the same way
+            app_module.session_pool.discard(auth)
+            break
+
+    request.app["log_request"](request=request, data=results)
+    return await respond(request, results, headers=_session_headers(auth))
+
+
+@api_routes.post(r"/proxy/{endpoint:.+}")
+@readiness.requires("network")
+async def proxy(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    auth = await _get_auth(request)
+    if isinstance(auth, aiohttp.web.Response):
+        return auth
+
+    if request.query.get("sync", "").lower() in ("true", "1"):
+        await _sync(auth)
+
+    endpoint, payload = request.match_info["endpoint"], await request.json()
+    if not app_module.RAW_PASSTHROUGH:
+        data = await auth.auth_request(endpoint, json=payload, handle_errors=False)
+        app_module.session_pool.check(auth, data)
+
+        request.app["log_request"](request=request, data=data)
+        return await respond(request, data, headers=_session_headers(auth), status=data.get("statusCode", 200))
+
+    upstream = await passthrough.auth_request(auth, endpoint, json=payload)
+    # only small bodies and errors are decoded, large ones are never errors
+    status = 200
+    if isinstance(upstream.data, dict):
+        app_module.session_pool.check(auth, upstream.data)
+        status = upstream.data.get("statusCode", 200)
+
+    headers = _session_headers(auth)
+    if responses.negotiate_format(request) == "json":
+        request.app["log_request"](request=request, raw_data=upstream.body)
+        return aiohttp.web.Response(
+            body=upstream.body,
+            status=status,
+            content_type="application/json",
+            headers={**headers, "Vary": "Accept"},
+        )
+
+    data = upstream.decode()
     request.app["log_request"](request=request, data=data)
-    return aiohttp.web.json_response(data, headers=headers, status=data.get("statusCode", 200))
+    return await respond(request, data, headers=headers, status=status)
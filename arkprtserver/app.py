@@ -1,23 +1,49 @@
 """Server app."""
 
 import asyncio
-import base64
+import copy
 import datetime
 import logging
-import re
+import os
+import pathlib
 import sys
+import time
 import traceback
 import typing
-import urllib.parse
 
 import aiohttp
 import aiohttp.web
 import arkprts
-import bson
 import dotenv
 import jinja2
 
-from . import export
+from . import (
+    banners,
+    cache,
+    compression,
+    export,
+    gamedata,
+    guests,
+    images,
+    offload,
+    pages,
+    readiness,
+    sanity,
+    sessions,
+    snapshot,
+    staticfiles,
+    userpage,
+)
+from .images import (
+    get_asset,
+    get_avatar,
+    get_charavatar,
+    get_charimage,
+    get_charportrait,
+    get_image,
+    get_skill,
+    normalize_filename,
+)
 
 __all__ = ("app",)
 
@@ -28,10 +54,83 @@ routes = aiohttp.web.RouteTableDef()
 env = jinja2.Environment(loader=jinja2.PackageLoader("arkprtserver"), autoescape=True, extensions=["jinja2.ext.do"])
 
 network = arkprts.NetworkSession(default_server="en")
+guest_pool = guests.GuestPool(
+    int(os.environ.get("GUEST_POOL_SIZE", "6")),
+    strategy=os.environ.get("GUEST_POOL_STRATEGY", "least-loaded"),
+    quarantine=float(os.environ.get("GUEST_QUARANTINE", "60")),
+    network=network,
+)
 client = arkprts.Client(
+    guest_pool,
     assets=arkprts.GitAssets(default_server="en"),
     network=network,
 )
+indexes = gamedata.GamedataIndexes(client)
+images.set_base_urls(**{repo: os.environ.get(f"IMAGE_URL_{repo.upper()}", "") for repo in images.BASE_URLS})
+
+FRIEND_INFO_LIMIT = 50
+"""Maximum amount of uids the game server accepts in a single friend info request."""
+
+search_cache: cache.TTLCache[tuple[str, str, str], typing.Sequence[typing.Any]] = cache.TTLCache(
+    maxsize=int(os.environ.get("SEARCH_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("SEARCH_CACHE_TTL", "60")),
+    negative_ttl=float(os.environ.get("SEARCH_CACHE_NEGATIVE_TTL", "0")),
+)
+
+export_cache: cache.TTLCache[tuple[str, str, str, str], typing.Mapping[str, bytes]] = cache.TTLCache(
+    maxsize=int(os.environ.get("EXPORT_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("EXPORT_CACHE_TTL", "300")),
+)
+
+session_pool = sessions.SessionPool(
+    network,
+    maxsize=int(os.environ.get("SESSION_POOL_SIZE", "256")),
+    idle_timeout=float(os.environ.get("SESSION_IDLE_TIMEOUT", "600")),
+)
+
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", str(arkprts.network.APPDATA_DIR / "arkprtserver" / "snapshot.marshal"))
+"""Path of the warm-start gamedata snapshot, empty to disable."""
+SNAPSHOT_GLOBALS = ("announcements", "preannouncement", "banneroperators")
+"""Template globals persisted in the snapshot."""
+
+wiki_cache = banners.WikiCache(
+    os.environ.get("WIKI_CACHE_DIR", str(arkprts.network.APPDATA_DIR / "arkprtserver" / "wiki")),
+    timeout=float(os.environ.get("WIKI_TIMEOUT", "10")),
+)
+dyn_meta_cache = banners.DynMetaCache()
+
+REFRESH_INTERVAL = float(os.environ.get("REFRESH_INTERVAL", "3600"))
+"""Seconds between background gamedata refreshes, 0 disables."""
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+"""Bearer token of the admin endpoints, empty disables them."""
+BANNER_TABLES = frozenset(("gamedata/excel/gacha_table.json", "gamedata/excel/character_table.json"))
+"""Tables banner operators are derived from."""
+
+GAMEDATA_SERVERS: typing.Sequence[str] = os.environ.get("GAMEDATA_SERVERS", "en,jp,kr,cn").split(",")
+"""Servers whose gamedata is loaded at startup, the others are loaded on first use."""
+LANGUAGE_IDLE_TIMEOUT = float(os.environ.get("LANGUAGE_IDLE_TIMEOUT", "3600"))
+"""Seconds after which an unused lazily loaded language is unloaded, 0 disables."""
+
+loaded_languages: set[str] = set()
+"""Servers whose gamedata is currently loaded."""
+language_last_used: dict[str, float] = {}
+"""Last time a language was requested."""
+language_flight: cache.SingleFlight[str, None] = cache.SingleFlight()
+
+table_hashes: dict[tuple[str, str], str] = {}
+"""Hashes of the loaded table files by server and path."""
+refresh_status: dict[str, typing.Any] = {
+    "running": False,
+    "last_refresh": None,
+    "duration": None,
+    "version": None,
+    "changed_tables": [],
+    "error": None,
+}
+"""Outcome of the last gamedata refresh."""
+refresh_flight: cache.SingleFlight[str, typing.Mapping[str, typing.Any]] = cache.SingleFlight()
+refresh_lock: asyncio.Lock = asyncio.Lock()
+"""Keeps gamedata refreshes from running at the same time."""
 
 LOGGER: logging.Logger = logging.getLogger("arkprtserver")
 
@@ -44,225 +143,413 @@ except ImportError:
     pass
 
 
-def get_image(type: str, id: str, other_repo: bool = False) -> str:
-    id = str(id)
-    id = id.replace("@", "_") if "@" in id else id.replace("#", "_")
-    id = urllib.parse.quote(id)
+env_globals = dict(
+    get_image=get_image,
+    get_avatar=get_avatar,
+    normalize_filename=normalize_filename,
+    get_charimage=get_charimage,
+    get_charavatar=get_charavatar,
+    get_charportrait=get_charportrait,
+    get_skill=get_skill,
+    get_asset=get_asset,
+    export=export,
+    client=client,
+    gamedata=client.assets,
+    indexes=indexes,
+    datetime=datetime,
+)
+env.globals.update(env_globals)  # type: ignore
+app.update(env_globals)  # type: ignore
+app["log_request"] = globals().get("log_request", lambda **_: None)  # type: ignore
 
-    if other_repo:
-        return f"https://raw.githubusercontent.com/yuanyan3060/ArknightsGameResource/main/{type}/{id}.png"
-    return f"https://raw.githubusercontent.com/Aceship/Arknight-Images/main/{type}/{id}.png"
+page_cache = pages.PageCache(env)
+"""Index and about pages, rendered again when announcements change."""
+
+RAW_PASSTHROUGH = os.environ.get("RAW_PASSTHROUGH", "true").lower() in ("true", "1")
+"""Whether raw json from the game server is forwarded as received instead of decoded and encoded again."""
+
+CACHE_CONTROL: typing.Mapping[str, str] = {
+    "/api/search": os.environ.get("CACHE_CONTROL_SEARCH", "public, no-cache"),
+    "/api/user": os.environ.get("CACHE_CONTROL_USER", "private, no-cache"),
+    "/api/raw/user": os.environ.get("CACHE_CONTROL_RAW_USER", "private, no-cache"),
+}
+"""Cache-Control of the responses that carry an ETag by route."""
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+"""Bytes from which responses are compressed."""
+COMPRESS_OFFLOAD_SIZE = int(os.environ.get("COMPRESS_OFFLOAD_SIZE", str(2**16)))
+"""Bytes from which responses are compressed in a thread instead of on the event loop."""
+static_files = staticfiles.StaticFiles(
+    pathlib.Path(__file__).with_name("static"),
+    os.environ.get("STATIC_CACHE_DIR", str(arkprts.network.APPDATA_DIR / "arkprtserver" / "static")),
+)
+env.globals["static_url"] = static_files.url
+
+STREAM_USER_PAGE = os.environ.get("STREAM_USER_PAGE", "true").lower() in ("true", "1")
+"""Whether the user page is streamed in chunks instead of rendered at once."""
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", str(2**14)))
+"""Characters buffered before a chunk of a streamed page is sent."""
+STREAM_FLUSH_MARKER = "\x00flush\x00"
+"""Emitted by `flush()` in streamed templates to send everything rendered so far."""
+STREAM_ERROR_NOTICE = b'<p class="error">Internal server error, the rest of this page could not be rendered.</p>'
+"""Ends a streamed page that failed after its first chunk was sent."""
+
+offloader = offload.Offloader(
+    os.environ.get("RENDER_EXECUTOR", "thread"),
+    workers=int(os.environ.get("RENDER_WORKERS", "0")) or None,
+    threshold=int(os.environ.get("OFFLOAD_THRESHOLD", "20")),
+)
+loop_lag = offload.LoopLagMonitor(float(os.environ.get("LOOP_LAG_INTERVAL", "0.5")))
 
+sanity_streams = sanity.SanityStreams(
+    sync_interval=float(os.environ.get("SANITY_SYNC_INTERVAL", "3600")),
+    heartbeat=float(os.environ.get("SANITY_HEARTBEAT", "30")),
+)
 
-def get_avatar(char_id: str, skin_id: str) -> str:
-    if "@" not in skin_id and skin_id.endswith("#1"):
-        skin_id = char_id
+startup_phases = readiness.Readiness()
+STARTUP_TIMEOUT = float(os.environ.get("STARTUP_TIMEOUT", "30"))
+"""Seconds a request waits for the startup phases it needs before getting a 503."""
+
+
+async def search_raw_players(
+    nickname: str,
+    nicknumber: str = "",
+    *,
+    server: typing.Optional[str] = None,
+) -> typing.Sequence[typing.Any]:
+    """Search for raw players, sharing results between identical searches."""
+    if "#" in nickname:
+        nickname, nicknumber = nickname.split("#", 1)
+    server = server or client.network.default_server or "en"
+
+    async def fetch() -> typing.Sequence[typing.Any]:
+        uid_data = await client.search_raw_player_ids(nickname, nicknumber, server=server)  # type: ignore
+        return await get_raw_players([uid["uid"] for uid in uid_data["result"]], server=server)
+
+    return await search_cache.fetch((server, nickname, nicknumber), fetch)
+
+
+async def get_raw_players(
+    uids: typing.Sequence[str],
+    *,
+    server: typing.Optional[str] = None,
+) -> typing.Sequence[typing.Any]:
+    """Get raw players by their uids, in as few friend info requests as the game server allows."""
+    server = server or client.network.default_server or "en"
+    chunks = [uids[i : i + FRIEND_INFO_LIMIT] for i in range(0, len(uids), FRIEND_INFO_LIMIT)]
+    datas = await asyncio.gather(*(client.get_raw_friend_info(chunk, server=server) for chunk in chunks))  # type: ignore
+    return [user for data in datas for user in data["friends"]]
+
+
+async def get_raw_players_batch(
+    nicknames: typing.Sequence[str] = (),
+    uids: typing.Sequence[str] = (),
+    *,
+    server: typing.Optional[str] = None,
+) -> typing.Sequence[typing.Any]:
+    """Get raw players by any mix of nicknames and uids, in the order they were asked for.
+
+    Nicknames are searched like `search_raw_players`, sharing cached and in-flight searches,
+    while all uids are fetched together at the same time.
+    """
+    server = server or client.network.default_server or "en"
+
+    *searches, fetched = await asyncio.gather(
+        *(search_raw_players(nickname, server=server) for nickname in nicknames),
+        get_raw_players(uids, server=server),
+    )
+    fetched_by_uid = {user["uid"]: user for user in fetched}
 
-    return get_image("avatar", skin_id, True)
+    users: dict[str, typing.Any] = {}
+    for user in [*(user for search in searches for user in search), *map(fetched_by_uid.get, uids)]:
+        if user is not None:
+            users.setdefault(user["uid"], user)
 
+    return list(users.values())
 
-def normalize_filename(filename: str) -> str:
-    """Transform filename from the id to the asset filename."""
-    filename = filename.replace("@", "_") if "@" in filename else filename.replace("#", "_")
-    return urllib.parse.quote(filename)
 
+async def search_players(
+    nickname: str,
+    nicknumber: str = "",
+    *,
+    server: typing.Optional[str] = None,
+) -> typing.Sequence[arkprts.models.Player]:
+    """Search for players and return models."""
+    users = await search_raw_players(nickname, nicknumber, server=server)
+    return to_player_models(users)
 
-def get_charimage(char_id: str, skin_id: typing.Optional[str], *, lowres: bool = False) -> str:
-    """Get a full image of a character."""
-    if not skin_id or ("@" not in skin_id and skin_id.endswith("#1")):
-        skin_id = char_id + "_1"
 
-    if lowres:
-        skin_id += "b"
+def to_player_models(users: typing.Sequence[typing.Any]) -> typing.Sequence[arkprts.models.Player]:
+    """Turn raw players into models."""
+    # models modify their input, the cached data must stay intact
+    return [arkprts.models.Player(client=client, **copy.deepcopy(user)) for user in users]
 
-    return get_asset("arts/characters", char_id, normalize_filename(skin_id))
 
+async def startup_network() -> None:
+    """Load the version config of the default server."""
+    try:
+        await network.load_version_config()
+    except Exception:
+        LOGGER.exception("Failed to load the version config, it will be retried on first use.")
 
-def get_charavatar(char_id: str, skin_id: typing.Optional[str]) -> str:
-    """Get a character portrait."""
-    if not skin_id or skin_id.endswith("#1"):
-        return get_asset("arts/charavatars", normalize_filename(char_id))
-    if skin_id.endswith("#2"):
-        return get_asset("arts/charavatars/elite", normalize_filename(skin_id))
-    if "@" in skin_id:
-        return get_asset("arts/charavatars/skins", normalize_filename(skin_id))
+    startup_phases.set("network")
 
-    return get_asset("arts/charavatars", normalize_filename(char_id))
 
+async def build_static_files(app: aiohttp.web.Application) -> None:
+    """Build the hashed and precompressed static files before the first page links to them."""
+    try:
+        await asyncio.to_thread(static_files.build)
+    except OSError:
+        LOGGER.exception("Could not build static files, serving them without compression or hashed URLs.")
+        static_files.directory = static_files.source
 
-def get_charportrait(char_id: str, skin_id: typing.Optional[str]) -> str:
-    """Get a character portrait."""
-    return get_asset("arts/charportraits", normalize_filename((skin_id and skin_id.lower()) or char_id + "#1"))
 
+async def startup(app: aiohttp.web.Application) -> None:
+    """Startup function."""
+    loop_lag.start()
+    for coroutine in (startup_network(), startup_gamedata(app)):
+        task = asyncio.create_task(coroutine)
+        task.add_done_callback(lambda _: None)  # little hack
 
-def get_skill(skill_name: str) -> str:
-    skill_name = "skill_icon_" + skill_name
-    if "skcom" in skill_name:
-        return get_asset(
-            "arts/skills",
-            skill_name,
-            skill_name + ".png",
-            skill_name + ".png",
-        )  # what the hell did I mess up
 
-    return get_asset("arts/skills", skill_name)
+app.on_startup.append(build_static_files)
+app.on_startup.append(startup)
 
 
-def get_asset(*paths: str, ext: str = "png") -> str:
-    """Get an asset from the ArknightsAssets repo."""
-    path = "/".join(paths) + "." + ext if not any("." in path for path in paths) else "/".join(paths)
-    return f"https://raw.githubusercontent.com/ArknightsAssets/ArknightsAssets/cn/assets/torappu/dynamicassets/{path}"
+async def get_banner_operators() -> typing.Mapping[str, typing.Sequence[str]]:
+    """Get a mapping of banner IDs to banner operators. Assumes client has loaded gamedata."""
+    return await banners.get_banner_operators(
+        client.network.session,
+        character_table=client.assets.get_excel("character_table", server="en"),
+        gacha_pools=client.assets.get_excel("gacha_table", server="en")["gachaPoolClient"],
+        wiki=wiki_cache,
+        dyn_metas=dyn_meta_cache,
+    )
 
 
-env_globals = dict(
-    get_image=get_image,
-    get_avatar=get_avatar,
-    normalize_filename=normalize_filename,
-    get_charimage=get_charimage,
-    get_charavatar=get_charavatar,
-    get_charportrait=get_charportrait,
-    get_skill=get_skill,
-    get_asset=get_asset,
-    export=export,
-    client=client,
-    gamedata=client.assets,
-    datetime=datetime,
-)
-env.globals.update(env_globals)  # type: ignore
-app["log_request"] = globals().get("log_request", lambda **_: None)  # type: ignore
+def precompute_asset_urls() -> None:
+    """Precompute the image URLs of every operator (apart from outfits), skill, item and module of the default server."""
+    index = indexes.user_page(client.assets.default_server or "en")
+    images.precompute_urls(
+        characters=index.characters,
+        skills=((skill_id, skill.get("icon_id")) for skill_id, skill in index.language.skills.items()),
+        items=(item.icon_id for item in index.items.values()),
+        modules=((module_id, module.type_icon) for module_id, module in index.modules.items()),
+    )
 
-startup_event = asyncio.Event()
 
+async def update_gamedata(servers: typing.Iterable[str] = ()) -> None:
+    """Download new gamedata of the given or all loaded servers."""
+    if isinstance(client.assets, arkprts.BundleAssets):
+        servers = servers or loaded_languages or GAMEDATA_SERVERS
+        await asyncio.gather(*[client.assets.update_assets(server=server) for server in servers])  # type: ignore
+    else:
+        await client.assets.update_assets()
 
-async def startup(app: aiohttp.web.Application) -> None:
-    """Startup function."""
-    task = asyncio.create_task(startup_gamedata(app))
-    task.add_done_callback(lambda _: None)  # little hack
 
+async def _load_language(server: str) -> None:
+    """Download and parse the gamedata of a language off the event loop."""
+    LOGGER.info("Loading %s gamedata.", server)
+    if isinstance(client.assets, arkprts.BundleAssets):
+        await update_gamedata((server,))
+
+    paths = [f"gamedata/excel/{name}.json" for name in gamedata.LANGUAGE_TABLES]
+    tables = await asyncio.to_thread(snapshot.load_excel_tables, client.assets, {server: paths})
+    client.assets.excel_cache.setdefault(server, {}).update(tables[server])  # type: ignore
+    indexes.invalidate((server,))
+    loaded_languages.add(server)
 
-app.on_startup.append(startup)
 
+def unload_idle_languages() -> None:
+    """Unload lazily loaded languages which have not been used for a while."""
+    if LANGUAGE_IDLE_TIMEOUT <= 0:
+        return
 
-async def _scrape_wikigg(page: str) -> str:
-    """Scrape the raw content of arknights.wiki.gg."""
-    async with client.network.session.get(f"https://arknights.wiki.gg/wiki/{page}?action=raw") as r:
-        return await r.text()
+    now = time.monotonic()
+    for server in list(loaded_languages):
+        if server in GAMEDATA_SERVERS or now - language_last_used.get(server, now) < LANGUAGE_IDLE_TIMEOUT:
+            continue
 
+        LOGGER.info("Unloading idle %s gamedata.", server)
+        loaded_languages.discard(server)
+        client.assets.excel_cache.pop(server, None)  # type: ignore
+        indexes.invalidate((server,))
+        for key in [key for key in table_hashes if key[0] == server]:
+            del table_hashes[key]
 
-def _operator_to_id(name: str) -> str:
-    """Convert an operator name to its ID."""
-    name = name.strip()
-    if name == "Mlynar":
-        return "char_4064_mlynar"
-    for operatorkey, operatorvalue in client.assets.get_excel("character_table", server="en").items():
-        if operatorvalue["name"].lower() == name.lower():
-            return operatorkey
 
-    return "char_002_amiya"
+async def use_language(server: str) -> gamedata.LanguageIndex:
+    """Get the index of a language, loading its gamedata on first use."""
+    language_last_used[server] = time.monotonic()
+    if server not in loaded_languages:
+        await language_flight.do(server, lambda: _load_language(server))
 
+    unload_idle_languages()
+    return indexes[server]
 
-async def get_banner_operators() -> typing.Mapping[str, typing.Sequence[str]]:
-    """Get a mapping of banner IDs to banner operators. Assumes client has loaded gamedata."""
-    pagelocs = ["Headhunting/Banners"] + [f"Headhunting/Banners/Former-{i}" for i in (2024, 2023, 2022, 2021, 2020)]
-    pages = await asyncio.gather(*(_scrape_wikigg(i) for i in pagelocs))
-
-    wikibanners: typing.Sequence[typing.Mapping[str, typing.Any]] = []
-    for page in pages:
-        for match in re.finditer(r"\{\{Banners cell\|(.+?)\}\}", page):
-            arguments: typing.Mapping[str, str] = dict(i.split("=", 1) for i in match[1].split("|"))
-            dates = (arguments.get("global") or arguments["date"]).split(" &ndash; ")
-            wikioperators: typing.Sequence[str] = arguments["operators"].split(",") if "operators" in arguments else []
-            if arguments.get("type") == "linkup":
-                wikioperators = wikioperators[1:]
-            if "limited" in arguments:
-                wikioperators = sorted(
-                    wikioperators,
-                    key=lambda i: int(arguments["limited"].split(",")[wikioperators.index(i)]),
-                    reverse=True,
-                )
-            wikibanners.append(
-                {
-                    "type": arguments.get("type", "standard"),
-                    "name": arguments["name"],
-                    "start": datetime.datetime.strptime(dates[0], "%B %d, %Y").timestamp(),  # noqa: DTZ007
-                    "end": datetime.datetime.strptime(dates[1], "%B %d, %Y").timestamp(),  # noqa: DTZ007
-                    "operators": wikioperators,
-                },
-            )
-
-    databanners = client.assets.get_excel("gacha_table", server="en")["gachaPoolClient"]
-
-    operators: typing.Mapping[str, typing.Sequence[str]] = {}
-    for databanner in databanners:
-        if databanner.get("dynMeta") and "base64" in databanner["dynMeta"]:
-            databanner["dynMeta"] = bson.loads(base64.b64decode(databanner["dynMeta"]["base64"]))  # pyright: ignore
-        if databanner.get("dynMeta") and "main6RarityCharId" in databanner["dynMeta"]:
-            operators[databanner["gachaPoolId"]] = [
-                databanner["dynMeta"]["main6RarityCharId"],
-                databanner["dynMeta"]["sub6RarityCharId"],
-                *databanner["dynMeta"]["rare5CharList"],
-            ]
-            continue
 
-        for wikibanner in wikibanners:
-            if wikibanner["name"].lower() == databanner["gachaPoolName"].lower():
-                operators[databanner["gachaPoolId"]] = list(map(_operator_to_id, wikibanner["operators"]))
-                break
-            if (
-                abs(wikibanner["start"] - databanner["openTime"]) < 86400
-                and abs(wikibanner["end"] - databanner["endTime"]) < 86400
-            ):
-                operators[databanner["gachaPoolId"]] = list(map(_operator_to_id, wikibanner["operators"]))
-                break
-
-    # special known cases that happen to be missing from the wiki:
-    operators["NORM_EN_0_1_1"] = list(map(_operator_to_id, ["Angelina", "Croissant", "Exusiai", "Skyfire", "Zima"]))
-    operators["NORM_EN_2_0_3"] = list(map(_operator_to_id, ["Hoshiguma", "Liskarm", "Meteorite"]))
-    # operators["NORM_EN_4_0_5"] = # unknown, "Fire Dancers" May 2020
-    operators["NORM_EN_5_0_4"] = list(
-        map(
-            _operator_to_id,
-            [
-                "Ch'en",
-                "SilverAsh",
-                "Eyjafjalla",
-                "Angelina",
-                "Swire",
-                "Manticore",
-                "Platinum",
-                "Texas",
-                "Croissant",
-                "Ptilopsis",
-            ],
-        ),
-    )  # fmt: off
-    operators["SINGLE_EN_27_0_1"] = list(map(_operator_to_id, ["Hoederer"]))
-
-    return operators
+async def update_startup_globals(changed_tables: typing.Collection[tuple[str, str]] = ()) -> None:
+    """Fetch announcements and banner operators.
+
+    Banner operators are only recomputed if their tables changed.
+    """
+    env.globals["announcements"] = await client.network.request("an")  # type: ignore
+    env.globals["preannouncement"] = await client.network.request("prean")  # type: ignore
+    startup_phases.set("announcements")
+    if "banneroperators" not in env.globals or any(
+        server == "en" and path in BANNER_TABLES for server, path in changed_tables
+    ):
+        env.globals["banneroperators"] = await get_banner_operators()  # type: ignore
+    startup_phases.set("banners")
+
+
+async def update_table_hashes() -> None:
+    """Hash the files of all loaded tables."""
+    tables = {server: list(paths) for server, paths in client.assets.excel_cache.items()}
+    hashes = await asyncio.to_thread(snapshot.hash_excel_tables, client.assets, tables)
+    table_hashes.clear()
+    table_hashes.update(hashes)
+
+
+async def reload_changed_tables(*, force: bool = False) -> typing.Collection[tuple[str, str]]:
+    """Download new gamedata and reload the loaded tables whose files changed.
+
+    The new tables are parsed off the event loop and swapped in all at once,
+    only the indexes of languages with changed tables are dropped.
+    """
+    await update_gamedata()
+    version = snapshot.get_assets_version(client.assets)
+    if not force and table_hashes and version == refresh_status["version"]:
+        return ()
+
+    tables = {server: list(paths) for server, paths in client.assets.excel_cache.items()}
+    hashes = await asyncio.to_thread(snapshot.hash_excel_tables, client.assets, tables)
+    changed = [key for key, digest in hashes.items() if force or table_hashes.get(key) != digest]
+
+    changed_paths: dict[str, list[str]] = {}
+    for server, path in changed:
+        changed_paths.setdefault(server, []).append(path)
+    reloaded = await asyncio.to_thread(snapshot.load_excel_tables, client.assets, changed_paths)
+
+    client.assets.excel_cache = {  # type: ignore
+        server: {**paths, **reloaded.get(server, {})} for server, paths in client.assets.excel_cache.items()
+    }
+    indexes.invalidate(changed_paths)
+
+    table_hashes.clear()
+    table_hashes.update(hashes)
+    refresh_status["version"] = version
+    return changed
+
+
+async def _refresh_gamedata(app: aiohttp.web.Application, *, force: bool = False) -> typing.Mapping[str, typing.Any]:
+    """Refresh gamedata and record the outcome, waiting for the running refresh first."""
+    async with refresh_lock:
+        refresh_status["running"] = True
+        started = time.monotonic()
+        try:
+            changed = await reload_changed_tables(force=force)
+            await asyncio.to_thread(precompute_asset_urls)
+            await update_startup_globals(changed)
+            app.update(env.globals)  # type: ignore
+
+            if SNAPSHOT_PATH:
+                await save_snapshot()
+        except Exception as e:
+            LOGGER.exception("Failed to refresh gamedata.")
+            refresh_status["error"] = f"{type(e).__name__}: {e}"
+        else:
+            LOGGER.info("Refreshed gamedata, %s tables changed.", len(changed))
+            refresh_status["error"] = None
+            refresh_status["changed_tables"] = [f"{server}/{path}" for server, path in changed]
+        finally:
+            refresh_status["running"] = False
+            refresh_status["last_refresh"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            refresh_status["duration"] = time.monotonic() - started
+
+        return dict(refresh_status)
+
+
+async def refresh_gamedata(app: aiohttp.web.Application, *, force: bool = False) -> typing.Mapping[str, typing.Any]:
+    """Refresh gamedata, joining an already pending refresh.
+
+    Forced refreshes never join regular ones, they run once the running refresh finishes.
+    Regular refreshes join a pending forced one since it reloads everything anyway.
+    """
+    key = "forced" if force or "forced" in refresh_flight.pending else "gamedata"
+    return await refresh_flight.do(key, lambda: _refresh_gamedata(app, force=force))
+
+
+async def refresh_gamedata_periodically(app: aiohttp.web.Application) -> None:
+    """Refresh gamedata every REFRESH_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL)
+        await refresh_gamedata(app)
+
+
+async def restore_snapshot() -> bool:
+    """Load the gamedata snapshot."""
+    data = await asyncio.to_thread(snapshot.load, SNAPSHOT_PATH)
+    if data is None:
+        return False
+
+    client.assets.excel_cache = data["excel"]  # type: ignore
+    client.assets.loaded = True
+    await asyncio.to_thread(indexes.rebuild, data["excel"])
+    loaded_languages.update(data["excel"])
+    language_last_used.update(dict.fromkeys(data["excel"], time.monotonic()))
+    env.globals.update(data["globals"])  # type: ignore
+    table_hashes.update(data["hashes"])
+    refresh_status["version"] = data["version"]
+
+    return True
+
+
+async def save_snapshot() -> None:
+    """Persist the loaded gamedata for the next startup."""
+    await asyncio.to_thread(
+        snapshot.save,
+        SNAPSHOT_PATH,
+        version=refresh_status["version"],
+        hashes=dict(table_hashes),
+        excel={server: dict(tables) for server, tables in client.assets.excel_cache.items()},
+        env_globals={name: env.globals[name] for name in SNAPSHOT_GLOBALS},
+    )
 
 
 async def startup_gamedata(app: aiohttp.web.Application) -> None:
     """Load gamedata."""
-    if isinstance(client.assets, arkprts.BundleAssets):
-        await asyncio.gather(*[client.assets.update_assets(server=server) for server in ("en", "jp", "kr", "cn")])
+    if SNAPSHOT_PATH and await restore_snapshot():
+        app.update(env.globals)  # type: ignore
+        await asyncio.to_thread(precompute_asset_urls)
+        startup_phases.set("gamedata", "announcements", "banners")
+        LOGGER.info("Startup finished from snapshot, revalidating.")
+
+        await refresh_gamedata(app)
     else:
-        await client.assets.update_assets()
+        await update_gamedata()
+        await asyncio.to_thread(indexes.rebuild, GAMEDATA_SERVERS)
+        loaded_languages.update(GAMEDATA_SERVERS)
+        await asyncio.to_thread(precompute_asset_urls)
+        startup_phases.set("gamedata")
+        await update_startup_globals()
 
-    env.globals["announcements"] = await client.network.request("an")  # type: ignore
-    env.globals["preannouncement"] = await client.network.request("prean")  # type: ignore
-    env.globals["banneroperators"] = await get_banner_operators()  # type: ignore
+        app.update(env.globals)  # type: ignore
 
-    app.update(env.globals)  # type: ignore
+        LOGGER.info("Startup finished.")
 
-    startup_event.set()
+        refresh_status["version"] = snapshot.get_assets_version(client.assets)
+        await update_table_hashes()
+        if SNAPSHOT_PATH:
+            await save_snapshot()
 
-    LOGGER.info("Startup finished.")
+    if REFRESH_INTERVAL > 0:
+        app["gamedata_refresher"] = asyncio.create_task(refresh_gamedata_periodically(app))
 
 
 async def reload_client() -> None:
     """Re-login and download new assets."""
-    assert isinstance(client.auth, arkprts.GuestAuth)
-    client.auth.sessions.clear()
+    guest_pool.clear()
 
 
 @aiohttp.web.middleware
@@ -284,18 +571,75 @@ async def cors_middleware(
     return response
 
 
+@aiohttp.web.middleware
+async def compression_middleware(
+    request: aiohttp.web.Request,
+    handler: typing.Callable[[aiohttp.web.Request], typing.Awaitable[aiohttp.web.StreamResponse]],
+) -> aiohttp.web.StreamResponse:
+    """Compress large responses with the encoding the client prefers.
+
+    Streamed and file responses are left alone, they handle their own encoding.
+    """
+    response = await handler(request)
+    if (
+        not isinstance(response, aiohttp.web.Response)
+        or response.prepared
+        or not isinstance(body := response.body, bytes)
+        or len(body) < COMPRESS_MIN_SIZE
+        or "Content-Encoding" in response.headers
+        or not compression.is_compressible(response.content_type)
+    ):
+        return response
+
+    if "Accept-Encoding" not in response.headers.getall("Vary", ()):
+        response.headers.add("Vary", "Accept-Encoding")
+
+    encoding = compression.negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+
+    level = compression.DYNAMIC_LEVELS[encoding]
+    if len(body) >= COMPRESS_OFFLOAD_SIZE:
+        response.body = await asyncio.to_thread(compression.compress, body, encoding, level=level)
+    else:
+        response.body = compression.compress(body, encoding, level=level)
+
+    response.headers["Content-Encoding"] = encoding
+    if (etag := response.etag) is not None and not etag.is_weak:
+        # the compressed body is a different representation
+        response.etag = aiohttp.ETag(value=etag.value, is_weak=True)
+
+    return response
+
+
 @aiohttp.web.middleware
 async def startup_middleware(
     request: aiohttp.web.Request,
     handler: typing.Callable[[aiohttp.web.Request], typing.Awaitable[aiohttp.web.StreamResponse]],
 ) -> aiohttp.web.StreamResponse:
-    """Startup middleware."""
-    if "/api" in request.path:
-        await startup_event.wait()
+    """Startup middleware.
 
-    if not startup_event.is_set():
+    Pages render a startup page right away, api routes wait a while for the startup phases they need.
+    """
+    phases = readiness.get_required_phases(request)
+    if startup_phases.is_ready(phases):
+        return await handler(request)
+
+    if not request.path.startswith(("/api", "/proxy", "/admin")):
         template = env.get_template("startup.html.j2")
-        return aiohttp.web.Response(text=template.render(request=request), content_type="text/html")
+        return aiohttp.web.Response(
+            text=template.render(request=request),
+            content_type="text/html",
+            status=503,
+            headers={"Retry-After": "5"},
+        )
+
+    if not await startup_phases.wait(phases, timeout=STARTUP_TIMEOUT):
+        return aiohttp.web.json_response(
+            {"message": "Server is starting up", "phases": startup_phases.status()},
+            status=503,
+            headers={"Retry-After": "5"},
+        )
 
     return await handler(request)
 
@@ -322,44 +666,153 @@ async def error_middleware(
 
 async def on_shutdown(app: aiohttp.web.Application) -> None:
     """Shutdown client."""
+    if refresher := app.get("gamedata_refresher"):
+        refresher.cancel()
+    sanity_streams.close()
+    guest_pool.close()
+    loop_lag.stop()
     await client.network.close()
 
 
+async def static_cache_headers(request: aiohttp.web.Request, response: aiohttp.web.StreamResponse) -> None:
+    """Let clients cache content-hashed static files forever."""
+    prefix = static_files.prefix + "/"
+    if request.path.startswith(prefix) and static_files.is_immutable(request.path[len(prefix) :]):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+
+
+async def on_cleanup(app: aiohttp.web.Application) -> None:
+    """Stop the render executors once every request has finished."""
+    offloader.shutdown()
+
+
 app.middlewares.append(cors_middleware)
+app.middlewares.append(compression_middleware)
 app.middlewares.append(startup_middleware)
 app.middlewares.append(error_middleware)
 app.on_shutdown.append(on_shutdown)
+app.on_cleanup.append(on_cleanup)
+app.on_response_prepare.append(static_cache_headers)
+
+
+def _chunk_pieces(pieces: typing.Iterable[str]) -> typing.Iterator[bytes]:
+    """Join rendered template pieces into encoded chunks of about STREAM_CHUNK_SIZE characters."""
+    buffer: list[str] = []
+    size = 0
+    for piece in pieces:
+        if piece != STREAM_FLUSH_MARKER:
+            buffer.append(piece)
+            size += len(piece)
+            if size < STREAM_CHUNK_SIZE:
+                continue
+
+        if buffer:
+            yield "".join(buffer).encode()
+            buffer.clear()
+            size = 0
+
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+async def render_template(template: jinja2.Template, *, size: int = 0, **context: typing.Any) -> str:
+    """Render a template, in the render thread pool if it shows `size` rows or more."""
+    return await offloader.run_in_thread(template.render, size=size, **context)
+
+
+async def stream_template(
+    request: aiohttp.web.Request,
+    template: jinja2.Template,
+    *,
+    size: int = 0,
+    **context: typing.Any,
+) -> aiohttp.web.StreamResponse:
+    """Render a template in chunks, only one chunk is held in memory at a time.
+
+    Templates may call `flush()` to send everything rendered so far, for example after the page header.
+    Chunks of templates showing `size` rows or more are rendered in the render thread pool.
+    The first chunk is rendered before anything is sent, so errors in it still get the error page.
+    Later errors can only end the page early with a short notice.
+    """
+    pieces = template.generate(request=request, flush=lambda: STREAM_FLUSH_MARKER, **context)
+    chunks = offloader.iterate(_chunk_pieces(pieces), size=size).__aiter__()
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+
+    response = aiohttp.web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+    response.enable_chunked_encoding()
+    response.enable_compression()
+    await response.prepare(request)
+
+    try:
+        await response.write(first_chunk)
+        async for chunk in chunks:
+            await response.write(chunk)
+    except ConnectionResetError:  # the client went away
+        return response
+    except Exception:
+        LOGGER.exception("Failed to render %s after the response was sent", template.name)
+        await response.write(STREAM_ERROR_NOTICE)
+
+    await response.write_eof()
+    return response
+
+
+@routes.get("/healthz")
+@readiness.requires()
+async def healthz(request: aiohttp.web.Request) -> aiohttp.web.Response:
+    """Liveness probe."""
+    return aiohttp.web.json_response({"status": "ok"})
+
+
+@routes.get("/readyz")
+@readiness.requires()
+async def readyz(request: aiohttp.web.Request) -> aiohttp.web.Response:
+    """Readiness probe, only ready once every startup phase has finished."""
+    ready = startup_phases.is_ready()
+    return aiohttp.web.json_response(
+        {"ready": ready, "phases": startup_phases.status()},
+        status=200 if ready else 503,
+        headers=None if ready else {"Retry-After": "5"},
+    )
 
 
 @routes.get("/")
+@readiness.requires("announcements")
 async def index(request: aiohttp.web.Request) -> aiohttp.web.Response:
     """Index page."""
-    template = env.get_template("index.html.j2")
-    return aiohttp.web.Response(text=template.render(request=request), content_type="text/html")
+    page = await page_cache.get("index.html.j2", (env.globals["announcements"], env.globals["preannouncement"]))
+    return page.response(request)
 
 
 @routes.get("/about")
+@readiness.requires()
 async def about(request: aiohttp.web.Request) -> aiohttp.web.Response:
     """About page."""
-    template = env.get_template("about.html.j2")
-    return aiohttp.web.Response(text=template.render(request=request), content_type="text/html")
+    page = await page_cache.get("about.html.j2")
+    return page.response(request)
 
 
 @routes.get("/search")
+@readiness.requires("gamedata")
 async def search(request: aiohttp.web.Request) -> aiohttp.web.Response:
     """Search for users."""
     users: typing.Sequence[arkprts.models.Player] = []
     if request.query.get("nickname"):
-        users = await client.search_players(request.query["nickname"], server=request.query.get("server"))  # type: ignore
+        users = await search_players(request.query["nickname"], server=request.query.get("server"))
 
     if request.query.get("all") not in ("1", "true"):
         users = [user for user in users if user.level >= 10]
 
     template = env.get_template("search.html.j2")
-    return aiohttp.web.Response(text=template.render(users=users, request=request), content_type="text/html")
+    text = await render_template(template, size=len(users), users=users, request=request)
+    return aiohttp.web.Response(text=text, content_type="text/html")
 
 
 @routes.get("/login")
+@readiness.requires("network")
 async def login(request: aiohttp.web.Request) -> aiohttp.web.Response:
     """Login."""
     template = env.get_template("login.html.j2")
@@ -400,6 +853,7 @@ async def login(request: aiohttp.web.Request) -> aiohttp.web.Response:
 
 
 @routes.get("/logout")
+@readiness.requires()
 async def logout(request: aiohttp.web.Request) -> aiohttp.web.Response:
     """Logout."""
     response = aiohttp.web.HTTPTemporaryRedirect("/login")
@@ -415,27 +869,48 @@ async def authorize(request: aiohttp.web.Request) -> typing.Union[arkprts.Client
     if not request.cookies.get("channeluid") or not request.cookies.get("token") or not request.cookies.get("server"):
         return aiohttp.web.HTTPTemporaryRedirect("/login")
 
-    auth = arkprts.YostarAuth(server=request.cookies["server"], network=client.network)  # type: ignore
-
-    await auth.login_with_token(request.cookies["channeluid"], request.cookies["token"])
+    auth = await session_pool.login_with_token(
+        request.cookies["server"],
+        request.cookies["channeluid"],
+        request.cookies["token"],
+    )
 
     return arkprts.Client(auth=auth, assets=client.assets)
 
 
 @routes.get("/user")
-async def user(request: aiohttp.web.Request) -> aiohttp.web.Response:
+@readiness.requires("gamedata", "banners")
+async def user(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
     """User."""
     user_client = await authorize(request)
     if isinstance(user_client, aiohttp.web.Response):
         return user_client
 
-    user = await user_client.get_data()
+    try:
+        user = await user_client.get_data()
+    except arkprts.errors.BaseArkprtsError as e:
+        session_pool.check(user_client.auth, e)  # type: ignore
+        raise
+
+    size = len(user.troop.chars)
+    page = await offloader.run_in_thread(
+        userpage.build_user_page,
+        user,
+        indexes.user_page(client.assets.default_server or "en"),
+        env.globals["banneroperators"],
+        size=size,
+    )
 
     template = env.get_template("user.html.j2")
-    return aiohttp.web.Response(text=template.render(user=user, request=request), content_type="text/html")
+    if STREAM_USER_PAGE:
+        return await stream_template(request, template, size=size, user=user, page=page)
+
+    text = await render_template(template, size=size, user=user, page=page, request=request)
+    return aiohttp.web.Response(text=text, content_type="text/html")
 
 
 @routes.get("/bundles")
+@readiness.requires("network")
 async def bundles(request: aiohttp.web.Request) -> aiohttp.web.Response:
     """Display downloadable bundles."""
     server = request.query.get("server", "cn")
@@ -469,7 +944,17 @@ async def bundles(request: aiohttp.web.Request) -> aiohttp.web.Response:
     return aiohttp.web.Response(text=html, content_type="text/html")
 
 
-app.router.add_static("/static", "arkprtserver/static", name="static")
+@routes.get(static_files.prefix + "/{path:.+}", name="static")
+@readiness.requires()
+async def static(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
+    """Serve a static file, its precompressed siblings are picked by `FileResponse`."""
+    path = static_files.resolve(request.match_info["path"])
+    if path is None:
+        raise aiohttp.web.HTTPNotFound
+
+    return aiohttp.web.FileResponse(path)
+
+
 app.add_routes(routes)
 
 from .api import api_routes  # noqa: E402
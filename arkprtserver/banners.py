@@ -0,0 +1,235 @@
+"""Banner operator resolution."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import datetime
+import json
+import logging
+import os
+import pathlib
+import re
+import typing
+import unicodedata
+
+import aiohttp
+import bson
+
+__all__ = ("DynMetaCache", "OperatorNameIndex", "WikiCache", "get_banner_operators", "normalize_name")
+
+LOGGER: logging.Logger = logging.getLogger("arkprtserver.banners")
+
+WIKI_PAGES: typing.Sequence[str] = (
+    "Headhunting/Banners",
+    *(f"Headhunting/Banners/Former-{i}" for i in (2024, 2023, 2022, 2021, 2020)),
+)
+"""arknights.wiki.gg pages listing banners."""
+
+OPERATOR_ALIASES: typing.Mapping[str, str] = {
+    "Mlynar": "char_4064_mlynar",
+}
+"""Operator names used by the wiki which do not match the gamedata."""
+
+DEFAULT_OPERATOR = "char_002_amiya"
+"""Operator used for names which cannot be resolved."""
+
+# special known cases that happen to be missing from the wiki:
+KNOWN_BANNERS: typing.Mapping[str, typing.Sequence[str]] = {
+    "NORM_EN_0_1_1": ["Angelina", "Croissant", "Exusiai", "Skyfire", "Zima"],
+    "NORM_EN_2_0_3": ["Hoshiguma", "Liskarm", "Meteorite"],
+    # "NORM_EN_4_0_5": # unknown, "Fire Dancers" May 2020
+    "NORM_EN_5_0_4": [
+        "Ch'en",
+        "SilverAsh",
+        "Eyjafjalla",
+        "Angelina",
+        "Swire",
+        "Manticore",
+        "Platinum",
+        "Texas",
+        "Croissant",
+        "Ptilopsis",
+    ],
+    "SINGLE_EN_27_0_1": ["Hoederer"],
+}
+"""Operators of banners which are missing from the wiki."""
+
+
+def normalize_name(name: str) -> str:
+    """Normalize an operator name for lookups, ignoring case, accents and apostrophe styles."""
+    name = unicodedata.normalize("NFKD", name.strip().replace("\u2019", "'")).casefold()
+    return " ".join("".join(char for char in name if not unicodedata.combining(char)).split())
+
+
+class OperatorNameIndex:
+    """Operator ids by their normalized english name."""
+
+    ids: dict[str, str]
+    """Operator ids by normalized name."""
+
+    def __init__(self, character_table: typing.Mapping[str, typing.Mapping[str, typing.Any]]) -> None:
+        self.ids = {}
+        for char_id, char in character_table.items():
+            self.ids.setdefault(normalize_name(char["name"]), char_id)
+
+        for alias, char_id in OPERATOR_ALIASES.items():
+            self.ids[normalize_name(alias)] = char_id
+
+    def get(self, name: str) -> str:
+        """Get the id of an operator by name."""
+        return self.ids.get(normalize_name(name), DEFAULT_OPERATOR)
+
+
+class WikiCache:
+    """On-disk cache of raw arknights.wiki.gg pages, revalidated with conditional requests.
+
+    If the wiki cannot be reached the cached copy is used instead.
+    """
+
+    directory: pathlib.Path
+    """Directory of the cached pages."""
+    timeout: float
+    """Seconds to wait for the wiki."""
+
+    def __init__(self, directory: os.PathLike[str] | str, *, timeout: float = 10) -> None:
+        self.directory = pathlib.Path(directory)
+        self.timeout = timeout
+
+    def _get_paths(self, page: str) -> tuple[pathlib.Path, pathlib.Path]:
+        """Get the content and metadata paths of a page."""
+        name = re.sub(r"[^\w.-]", "_", page)
+        return self.directory / f"{name}.txt", self.directory / f"{name}.json"
+
+    async def get(self, session: aiohttp.ClientSession, page: str) -> str | None:
+        """Get the raw content of a page, None if it is neither reachable nor cached."""
+        content_path, meta_path = self._get_paths(page)
+        cached = content_path.read_text("utf-8") if content_path.exists() else None
+        meta = json.loads(meta_path.read_text()) if cached is not None and meta_path.exists() else {}
+
+        headers: dict[str, str] = {}
+        if etag := meta.get("etag"):
+            headers["If-None-Match"] = etag
+        if last_modified := meta.get("last_modified"):
+            headers["If-Modified-Since"] = last_modified
+
+        try:
+            async with session.get(
+                f"https://arknights.wiki.gg/wiki/{page}?action=raw",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                if response.status == 304 and cached is not None:
+                    return cached
+
+                response.raise_for_status()
+                content = await response.text()
+                meta = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            LOGGER.warning("Failed to fetch wiki page %s, %s", page, "using cached copy" if cached else "skipping")
+            return cached
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        content_path.write_text(content, "utf-8")
+        meta_path.write_text(json.dumps(meta))
+        return content
+
+
+class DynMetaCache:
+    """Decoded gacha pool dynMeta by pool id."""
+
+    decoded: dict[str, tuple[str, typing.Mapping[str, typing.Any]]]
+    """Raw base64 and decoded dynMeta by pool id."""
+
+    def __init__(self) -> None:
+        self.decoded = {}
+
+    def get(self, pool: typing.Mapping[str, typing.Any]) -> typing.Mapping[str, typing.Any] | None:
+        """Get the decoded dynMeta of a gacha pool."""
+        dyn_meta = pool.get("dynMeta")
+        if not dyn_meta or "base64" not in dyn_meta:
+            return dyn_meta
+
+        pool_id, raw = pool["gachaPoolId"], dyn_meta["base64"]
+        if (entry := self.decoded.get(pool_id)) is not None and entry[0] == raw:
+            return entry[1]
+
+        decoded = bson.loads(base64.b64decode(raw))  # pyright: ignore
+        self.decoded[pool_id] = (raw, decoded)
+        return decoded
+
+
+def parse_wiki_banners(page: str, names: OperatorNameIndex) -> typing.Iterator[typing.Mapping[str, typing.Any]]:
+    """Parse the banner cells of a wiki page."""
+    for match in re.finditer(r"\{\{Banners cell\|(.+?)\}\}", page):
+        arguments: typing.Mapping[str, str] = dict(i.split("=", 1) for i in match[1].split("|"))
+        dates = (arguments.get("global") or arguments["date"]).split(" &ndash; ")
+        wikioperators: typing.Sequence[str] = arguments["operators"].split(",") if "operators" in arguments else []
+        if arguments.get("type") == "linkup":
+            wikioperators = wikioperators[1:]
+        if "limited" in arguments:
+            limited = arguments["limited"].split(",")
+            wikioperators = [
+                operator
+                for _, operator in sorted(
+                    enumerate(wikioperators),
+                    key=lambda item: int(limited[item[0]]),
+                    reverse=True,
+                )
+            ]
+        yield {
+            "type": arguments.get("type", "standard"),
+            "name": arguments["name"],
+            "start": datetime.datetime.strptime(dates[0], "%B %d, %Y").timestamp(),  # noqa: DTZ007
+            "end": datetime.datetime.strptime(dates[1], "%B %d, %Y").timestamp(),  # noqa: DTZ007
+            "operators": [names.get(operator) for operator in wikioperators],
+        }
+
+
+async def get_banner_operators(
+    session: aiohttp.ClientSession,
+    *,
+    character_table: typing.Mapping[str, typing.Mapping[str, typing.Any]],
+    gacha_pools: typing.Sequence[typing.Mapping[str, typing.Any]],
+    wiki: WikiCache,
+    dyn_metas: DynMetaCache,
+) -> typing.Mapping[str, typing.Sequence[str]]:
+    """Get a mapping of banner IDs to banner operators.
+
+    Banners whose dynMeta does not list their operators are matched with wiki banners by name or dates.
+    """
+    names = OperatorNameIndex(character_table)
+    pages = await asyncio.gather(*(wiki.get(session, page) for page in WIKI_PAGES))
+
+    wikibanners = [wikibanner for page in pages if page for wikibanner in parse_wiki_banners(page, names)]
+    wikibanners_by_name: dict[str, typing.Mapping[str, typing.Any]] = {}
+    for wikibanner in wikibanners:
+        wikibanners_by_name.setdefault(wikibanner["name"].lower(), wikibanner)
+
+    operators: dict[str, typing.Sequence[str]] = {}
+    for pool in gacha_pools:
+        dyn_meta = dyn_metas.get(pool)
+        if dyn_meta and "main6RarityCharId" in dyn_meta:
+            operators[pool["gachaPoolId"]] = [
+                dyn_meta["main6RarityCharId"],
+                dyn_meta["sub6RarityCharId"],
+                *dyn_meta["rare5CharList"],
+            ]
+            continue
+
+        wikibanner = wikibanners_by_name.get(pool["gachaPoolName"].lower()) or next(
+            (
+                wikibanner
+                for wikibanner in wikibanners
+                if abs(wikibanner["start"] - pool["openTime"]) < 86400
+                and abs(wikibanner["end"] - pool["endTime"]) < 86400
+            ),
+            None,
+        )
+        if wikibanner is not None:
+            operators[pool["gachaPoolId"]] = wikibanner["operators"]
+
+    for pool_id, known_operators in KNOWN_BANNERS.items():
+        operators[pool_id] = [names.get(operator) for operator in known_operators]
+
+    return operators
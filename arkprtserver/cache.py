@@ -0,0 +1,136 @@
+"""In-process caches."""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import time
+import typing
+
+__all__ = ("SingleFlight", "TTLCache")
+
+K = typing.TypeVar("K", bound=typing.Hashable)
+V = typing.TypeVar("V")
+
+
+class SingleFlight(typing.Generic[K, V]):
+    """Coalesce concurrent calls with the same key into a single in-flight call."""
+
+    pending: dict[K, asyncio.Future[V]]
+    """Calls currently in flight."""
+
+    def __init__(self) -> None:
+        self.pending = {}
+
+    async def do(self, key: K, func: typing.Callable[[], typing.Awaitable[V]]) -> V:
+        """Await func or join an already running call with the same key.
+
+        The call runs in its own task, a cancelled caller does not cancel it for everyone else.
+        """
+        if (future := self.pending.get(key)) is None:
+            future = self.pending[key] = asyncio.ensure_future(func())
+            future.add_done_callback(lambda future: self._done(key, future))
+
+        return await asyncio.shield(future)
+
+    def _done(self, key: K, future: asyncio.Future[V]) -> None:
+        """Forget a finished call."""
+        self.pending.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # mark as retrieved even if every caller went away
+
+
+class TTLCache(typing.Generic[K, V]):
+    """LRU cache whose entries expire after a time-to-live.
+
+    Concurrent misses of the same key share a single call to the fetch function.
+    Empty values are only cached when negative_ttl is set.
+    """
+
+    maxsize: int
+    """Maximum amount of entries, least recently used entries are evicted first."""
+    ttl: float
+    """Seconds a value stays fresh."""
+    negative_ttl: float
+    """Seconds an empty value stays fresh, 0 disables negative caching."""
+    entries: collections.OrderedDict[K, tuple[float, V]]
+    """Values and their expiry time in least recently used order."""
+    flights: SingleFlight[K, V]
+    """Fetches currently in flight."""
+    hits: int
+    """Lookups served from the cache."""
+    misses: int
+    """Lookups that had to be fetched."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, *, negative_ttl: float = 0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = collections.OrderedDict()
+        self.flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: K) -> V | None:
+        """Get a fresh value or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """Store a value, empty values are dropped unless negative caching is enabled."""
+        ttl = self.ttl if value else self.negative_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            self.entries.pop(key, None)
+            return
+
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        """Remove a value."""
+        entry = self.entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        """Remove all values."""
+        self.entries.clear()
+
+    async def fetch(self, key: K, func: typing.Callable[[], typing.Awaitable[V]]) -> V:
+        """Get a fresh value or fetch it with func."""
+        if (value := self.get(key)) is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+
+        async def fetch_and_store() -> V:
+            value = await func()
+            self.set(key, value)
+            return value
+
+        return await self.flights.do(key, fetch_and_store)
+
+    def stats(self) -> typing.Mapping[str, float]:
+        """Get the cache counters."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self.entries),
+            "in_flight": len(self.flights.pending),
+        }
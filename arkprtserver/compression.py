@@ -0,0 +1,98 @@
+"""Content encoding of response bodies."""
+
+from __future__ import annotations
+
+import gzip
+import typing
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = (
+    "DYNAMIC_LEVELS",
+    "ENCODINGS",
+    "MAX_LEVELS",
+    "compress",
+    "is_compressible",
+    "negotiate_encoding",
+    "parse_qualities",
+)
+
+ENCODINGS: typing.Sequence[str] = tuple(
+    encoding for encoding, module in (("zstd", zstandard), ("br", brotli), ("gzip", gzip)) if module is not None
+)
+"""Supported content encodings, most preferred first."""
+MAX_LEVELS: typing.Mapping[str, int] = {"zstd": 19, "br": 11, "gzip": 9}
+"""Levels of content compressed once and served many times."""
+DYNAMIC_LEVELS: typing.Mapping[str, int] = {"zstd": 3, "br": 4, "gzip": 6}
+"""Levels of content compressed on every response, trading size for speed."""
+COMPRESSIBLE_TYPES: typing.Collection[str] = frozenset(
+    (
+        "application/javascript",
+        "application/json",
+        "application/xml",
+        "application/bson",
+        "application/msgpack",
+        "image/svg+xml",
+    ),
+)
+"""Compressible content types besides text."""
+
+
+def compress(body: bytes, encoding: str, *, level: int | None = None) -> bytes:
+    """Compress a body with a content encoding, at the highest level if none is given."""
+    if level is None:
+        level = MAX_LEVELS[encoding]
+
+    if encoding == "gzip":
+        return gzip.compress(body, level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(body)
+
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check whether content of a type is worth compressing."""
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+def parse_qualities(header: str) -> dict[str, float]:
+    """Parse the qualities of an Accept-like header by lowercased value."""
+    qualities: dict[str, float] = {}
+    for part in header.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if name := name.strip():
+            qualities[name] = quality
+
+    return qualities
+
+
+def negotiate_encoding(accept_encoding: str, available: typing.Iterable[str] = ENCODINGS) -> str | None:
+    """Pick the preferred available encoding allowed by an Accept-Encoding header, None for identity."""
+    qualities = parse_qualities(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
@@ -6,6 +6,8 @@ import urllib.parse
 import arkprts.models
 import typing_extensions
 
+from . import gamedata
+
 T = typing.TypeVar("T")
 
 KroosterOperators = typing.Mapping[
@@ -41,43 +43,37 @@ def get_krooster_skin(skin: str, char_id: str) -> str:
     return skin.replace("#", "_")
 
 
-def export_krooster_operators(user: arkprts.models.User) -> KroosterOperators:
-    """Export characters to krooster."""
-    data: KroosterOperators = {}
-    chars: list[arkprts.models.data.Character] = []
+def _iter_chars(user: arkprts.models.User) -> typing.Iterator[arkprts.models.data.Character]:
+    """Iterate over owned operators, with every form of Amiya."""
     for char in user.troop.chars.values():
         if char.variations:
-            chars.extend(char.variations.values())
+            yield from char.variations.values()
         else:
-            chars.append(char)
-
-    for char in chars:
-        data[char.char_id] = {
-            "id": char.char_id,
-            "name": char.static.name,
-            "favorite": char.star_mark,
-            "rarity": int(char.static.rarity[-1]),
-            "class": {
-                "WARRIOR": "Guard",
-                "SNIPER": "Sniper",
-                "TANK": "Defender",
-                "MEDIC": "Medic",
-                "SUPPORT": "Supporter",
-                "CASTER": "Caster",
-                "SPECIAL": "Specialist",
-                "PIONEER": "Vanguard",
-            }[char.static.profession],
-            "potential": char.potential_rank + 1,
-            "promotion": char.evolve_phase,
-            "owned": True,
-            "level": char.level,
-            "skillLevel": char.main_skill_lvl,
-            "mastery": [skill.specialize_level or None for skill in char.skills],
-            "module": [module.level if not module.locked else None for module in char.equip.values()][1:],
-            "skin": urllib.parse.quote(get_krooster_skin(char.skin, char.char_id)),
-        }
+            yield char
+
+
+def _export_krooster_operator(char: arkprts.models.data.Character, static: typing.Any) -> typing.Any:
+    """Export a single character to krooster."""
+    return {
+        "id": char.char_id,
+        "name": static.name,
+        "favorite": char.star_mark,
+        "rarity": int(static.rarity[-1]),
+        "class": gamedata.EN_CLASS_NAMES[static.profession],
+        "potential": char.potential_rank + 1,
+        "promotion": char.evolve_phase,
+        "owned": True,
+        "level": char.level,
+        "skillLevel": char.main_skill_lvl,
+        "mastery": [skill.specialize_level or None for skill in char.skills],
+        "module": [module.level if not module.locked else None for module in char.equip.values()][1:],
+        "skin": urllib.parse.quote(get_krooster_skin(char.skin, char.char_id)),
+    }
 
-    return data
+
+def export_krooster_operators(user: arkprts.models.User) -> KroosterOperators:
+    """Export characters to krooster."""
+    return {char.char_id: _export_krooster_operator(char, char.static) for char in _iter_chars(user)}
 
 
 def export_krooster_items(user: arkprts.models.User) -> str:
@@ -113,18 +109,23 @@ PenguinStatistics = typing.TypedDict(
 )
 
 
-def export_penguin_statistics(
-    user: arkprts.models.User,
-    previous: typing.Optional[PenguinStatistics] = None,
-) -> PenguinStatistics:
-    """Export items to penguin statistics."""
-    data: PenguinStatistics = {
+def _penguin_statistics_config(previous: typing.Optional[PenguinStatistics] = None) -> PenguinStatistics:
+    """Create a penguin statistics planner config without items."""
+    return {
         "@type": "@penguin-statistics/planner/config",
         "items": [],
         "options": previous["options"] if previous else {"byProduct": False, "requireExp": False, "requireLmb": False},
         "excludes": previous["excludes"] if previous else [],
     }
 
+
+def export_penguin_statistics(
+    user: arkprts.models.User,
+    previous: typing.Optional[PenguinStatistics] = None,
+) -> PenguinStatistics:
+    """Export items to penguin statistics."""
+    data = _penguin_statistics_config(previous)
+
     item_need: dict[str, int] = {}
     if previous is not None:
         for item in previous["items"]:
@@ -143,3 +144,36 @@ def export_penguin_statistics(
         )
 
     return data
+
+
+Exports = typing.TypedDict(
+    "Exports",
+    {
+        "krooster-operators": KroosterOperators,
+        "krooster-items": str,
+        "penguin": PenguinStatistics,
+    },
+)
+
+
+def export_all(
+    user: arkprts.models.User,
+    characters: typing.Optional[typing.Mapping[str, typing.Any]] = None,
+) -> Exports:
+    """Export user data to every service in a single pass over operators and items.
+
+    Static operator data is read from characters by id if given, which is much faster than `char.static`.
+    """
+    operators: dict[str, typing.Any] = {}
+    for char in _iter_chars(user):
+        static = characters[char.char_id] if characters is not None else char.static
+        operators[char.char_id] = _export_krooster_operator(char, static)
+
+    lines: list[str] = []
+    penguin = _penguin_statistics_config()
+    for item_id, count in user.inventory.items():
+        lines.append(f"{item_id},{count}")
+        if count > 0:
+            penguin["items"].append({"id": item_id, "have": count, "need": 0})
+
+    return {"krooster-operators": operators, "krooster-items": "itemId,owned\n" + "\n".join(lines), "penguin": penguin}
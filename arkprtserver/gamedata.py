@@ -0,0 +1,513 @@
+"""Lookup indexes derived from loaded gamedata."""
+
+from __future__ import annotations
+
+import bisect
+import re
+import typing
+
+import arkprts
+from arkprts.models import base as models
+
+from . import images
+
+__all__ = (
+    "BlackboardCache",
+    "BlackboardTemplate",
+    "GamedataIndexes",
+    "LanguageIndex",
+    "OperatorView",
+    "TalentCandidateView",
+    "UserPageIndex",
+    "format_blackboard",
+)
+
+EN_CLASS_NAMES: typing.Mapping[str, str] = {
+    "WARRIOR": "Guard",
+    "SNIPER": "Sniper",
+    "TANK": "Defender",
+    "MEDIC": "Medic",
+    "SUPPORT": "Supporter",
+    "CASTER": "Caster",
+    "SPECIAL": "Specialist",
+    "PIONEER": "Vanguard",
+}
+"""English class names by profession."""
+
+
+LANGUAGE_TABLES: typing.Sequence[str] = (
+    "medal_table",
+    "clue_data",
+    "handbook_team_table",
+    "uniequip_table",
+    "skill_table",
+    "stage_table",
+)
+"""Tables read in the requested language, everything else comes from the default server."""
+
+BLACKBOARD_PATTERN = re.compile(r"{(.+?)(?:\:(.+?))?}")
+"""Placeholder of a blackboard value, optionally with a format such as `0%`."""
+
+
+def _format_blackboard_value(value: object, percent: bool) -> str:
+    """Format a single blackboard value."""
+    string = str(value)
+    if string.replace(".", "").isnumeric() and float(string).is_integer():
+        string = str(int(float(string)))
+    if percent:
+        string = str(round(float(string) * 100)) + "%"
+
+    return string
+
+
+class BlackboardTemplate:
+    """A description using arknight's 'blackboard' templating, parsed into literal and placeholder segments."""
+
+    __slots__ = ("literals", "placeholders")
+
+    literals: tuple[str, ...]
+    """Literal text around placeholders, always one longer than placeholders."""
+    placeholders: tuple[tuple[str, bool], ...]
+    """Blackboard keys and whether they are formatted as percentages."""
+
+    def __init__(self, string: str) -> None:
+        literals: list[str] = []
+        placeholders: list[tuple[str, bool]] = []
+        end = 0
+        for match in BLACKBOARD_PATTERN.finditer(string):
+            literals.append(string[end : match.start()])
+            placeholders.append((match[1], bool(match[2]) and "%" in match[2]))
+            end = match.end()
+
+        literals.append(string[end:])
+        self.literals = tuple(literals)
+        self.placeholders = tuple(placeholders)
+
+    def format(self, blackboard: typing.Mapping[str, object]) -> str:
+        """Fill in the placeholders."""
+        if not self.placeholders:
+            return self.literals[0]
+
+        parts = [self.literals[0]]
+        for (key, percent), literal in zip(self.placeholders, self.literals[1:]):
+            parts.append(_format_blackboard_value(blackboard.get(key, "0"), percent))
+            parts.append(literal)
+
+        return "".join(parts)
+
+
+def format_blackboard(string: str, blackboard: typing.Mapping[str, object]) -> str:
+    """Format an object that uses arknight's 'blackboard' templating."""
+    # return re.sub(r"<([@$].+?|/)>", "", string)
+    return BlackboardTemplate(string).format(blackboard)
+
+
+class BlackboardCache:
+    """Formatted blackboard descriptions memoized by what they were formatted from.
+
+    Both the descriptions and their blackboards are static gamedata, so the cache is only cleared on reload.
+    """
+
+    templates: dict[str, BlackboardTemplate]
+    """Compiled templates by their source description."""
+    descriptions: dict[typing.Hashable, str]
+    """Formatted descriptions by their key, for example `("skill", lang, skill_id, level)`."""
+    hits: int
+    """Descriptions served from the cache.
+
+    Approximate, descriptions are formatted from render threads and counting is not locked to keep lookups cheap.
+    """
+    misses: int
+    """Descriptions that had to be formatted, approximate like `hits`."""
+
+    def __init__(self) -> None:
+        self.templates = {}
+        self.descriptions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, string: str) -> BlackboardTemplate:
+        """Get a compiled template of a description."""
+        if (template := self.templates.get(string)) is None:
+            template = self.templates[string] = BlackboardTemplate(string)
+
+        return template
+
+    def format(
+        self,
+        key: typing.Hashable,
+        source: typing.Callable[[], tuple[str, typing.Mapping[str, object]]],
+    ) -> str:
+        """Get a formatted description, calling source for the description and blackboard on a miss."""
+        if (description := self.descriptions.get(key)) is not None:
+            self.hits += 1
+            return description
+
+        self.misses += 1
+        string, blackboard = source()
+        description = self.descriptions[key] = self.compile(string).format(blackboard)
+        return description
+
+    def clear(self) -> None:
+        """Drop all templates and descriptions, keeping the counters."""
+        self.templates.clear()
+        self.descriptions.clear()
+
+    def discard(self, server: str) -> None:
+        """Drop the descriptions of a single language."""
+        for key in [key for key in self.descriptions if isinstance(key, tuple) and key[1:2] == (server,)]:
+            del self.descriptions[key]
+
+    def stats(self) -> typing.Mapping[str, float]:
+        """Get the cache counters, the hit and miss counts are approximate."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "templates": len(self.templates),
+            "descriptions": len(self.descriptions),
+        }
+
+
+class _Frozen:
+    """Base for immutable slotted views."""
+
+    __slots__ = ()
+
+    def __init__(self, **kwargs: typing.Any) -> None:
+        for name, value in kwargs.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: object) -> typing.NoReturn:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> typing.NoReturn:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({args})"
+
+
+class TalentCandidateView(_Frozen):
+    """Static data of a single talent candidate."""
+
+    __slots__ = ("description", "name", "phase", "required_potential_rank")
+
+    name: str
+    """Talent name."""
+    description: str
+    """Formatted talent description."""
+    required_potential_rank: int
+    """Potential rank required to unlock the candidate."""
+    phase: int
+    """Elite phase required to unlock the candidate."""
+
+    def is_unlocked(self, potential_rank: int, evolve_phase: int) -> bool:
+        """Whether a character has unlocked this candidate."""
+        return self.required_potential_rank <= potential_rank and self.phase <= evolve_phase
+
+
+class OperatorView(_Frozen):
+    """Player-independent data of an operator in a single language."""
+
+    __slots__ = (
+        "archetype_asset",
+        "archetype_id",
+        "archetype_name",
+        "class_asset",
+        "class_name",
+        "id",
+        "name",
+        "nation",
+        "number",
+        "profession",
+        "rarity",
+        "talents",
+        "team",
+    )
+
+    id: str
+    """Character id."""
+    name: str
+    """Localized name."""
+    nation: str | None
+    """Localized nation name."""
+    team: str | None
+    """Localized team name."""
+    number: str
+    """Display number."""
+    rarity: str
+    """Rarity as a single digit."""
+    profession: str
+    """Internal profession id."""
+    class_name: str
+    """English class name."""
+    class_asset: str
+    """Class icon URL."""
+    archetype_id: str
+    """Sub-profession id."""
+    archetype_name: str
+    """Localized sub-profession name."""
+    archetype_asset: str
+    """Sub-profession icon URL."""
+    talents: tuple[tuple[TalentCandidateView, ...], ...]
+    """Candidates of every talent, in gamedata order."""
+
+    def unlocked_talents(self, potential_rank: int, evolve_phase: int) -> typing.Iterator[TalentCandidateView]:
+        """Yield the best unlocked candidate of every talent."""
+        for candidates in self.talents:
+            candidate = next(
+                (c for c in reversed(candidates) if c.is_unlocked(potential_rank, evolve_phase)),
+                None,
+            )
+            if candidate is not None:
+                yield candidate
+
+
+class LanguageIndex:
+    """Id lookups for the excel tables of a single language."""
+
+    __slots__ = (
+        "archetypes",
+        "assets",
+        "blackboards",
+        "clue_types",
+        "clues",
+        "medal_groups",
+        "medals",
+        "operators",
+        "server",
+        "skills",
+        "teams",
+    )
+
+    assets: arkprts.Assets
+    """Assets the index was built from."""
+    server: str
+    """Language of the indexed tables."""
+    blackboards: BlackboardCache
+    """Shared cache of formatted skill and talent descriptions."""
+    medals: typing.Mapping[str, models.DDict]
+    """Medals by medal id."""
+    medal_groups: typing.Mapping[str, models.DDict]
+    """Medal groups by group id."""
+    clues: typing.Mapping[str, models.DDict]
+    """Clues by clue type."""
+    clue_types: typing.Mapping[str, models.DDict]
+    """Clue types by clue type."""
+    teams: typing.Mapping[str, models.DDict]
+    """Handbook teams (nations and factions) by power id."""
+    archetypes: typing.Mapping[str, str]
+    """Localized sub-profession names by sub-profession id."""
+    skills: typing.Mapping[str, models.DDict]
+    """Skills by skill id."""
+    operators: dict[str, OperatorView]
+    """Already built operator views by character id."""
+
+    def __init__(self, assets: arkprts.Assets, server: str, blackboards: BlackboardCache | None = None) -> None:
+        self.assets = assets
+        self.server = server
+        self.blackboards = blackboards or BlackboardCache()
+        self.operators = {}
+
+        medal_table = assets.get_excel("medal_table", server=server)  # type: ignore
+        self.medals = {}
+        for medal in medal_table.medal_list:
+            self.medals.setdefault(medal.medal_id, medal)  # type: ignore
+
+        self.medal_groups = {}
+        for groups in medal_table.medal_type_data.values():
+            for medal_group in groups.group_data:
+                self.medal_groups.setdefault(medal_group.group_id, medal_group)  # type: ignore
+
+        clue_data = assets.get_excel("clue_data", server=server)  # type: ignore
+        self.clues = {}
+        for clue in clue_data.clues:
+            self.clues.setdefault(clue.clue_type, clue)  # type: ignore
+
+        self.clue_types = {}
+        for clue_type in clue_data.clue_types:
+            self.clue_types.setdefault(clue_type.clue_type, clue_type)  # type: ignore
+
+        team_table = assets.get_excel("handbook_team_table", server=server)  # type: ignore
+        self.teams = {team_id: team_table[team_id] for team_id in team_table}
+
+        sub_prof_dict = assets.get_excel("uniequip_table", server=server).sub_prof_dict  # type: ignore
+        self.archetypes = {key: sub_prof.sub_profession_name for key, sub_prof in sub_prof_dict.items()}
+
+        skill_table = assets.get_excel("skill_table", server=server)  # type: ignore
+        self.skills = {skill_id: skill_table[skill_id] for skill_id in skill_table}
+
+    def describe_skill(self, skill_id: str, level: int) -> str:
+        """Get the formatted description of a skill level (0-indexed, masteries included)."""
+
+        def source() -> tuple[str, typing.Mapping[str, object]]:
+            skill_data = self.skills[skill_id].levels[level]
+            return skill_data.description, skill_data.blackboard
+
+        return self.blackboards.format(("skill", self.server, skill_id, level), source)
+
+    def get_operator(self, char_id: str) -> OperatorView:
+        """Get the static view of an operator, building it on first use."""
+        if view := self.operators.get(char_id):
+            return view
+
+        char_data = self.assets.get_operator(char_id, server=self.server)  # type: ignore
+        class_name = EN_CLASS_NAMES[char_data.profession]
+        talents: list[tuple[TalentCandidateView, ...]] = []
+        for talent_index, talent in enumerate(char_data.talents or ()):
+            candidates: list[TalentCandidateView] = []
+            for candidate_index, candidate in enumerate(talent.candidates):
+                key = ("talent", self.server, char_id, talent_index, candidate_index)
+
+                def source(candidate: models.DDict = candidate) -> tuple[str, typing.Mapping[str, object]]:
+                    return candidate.description, candidate.blackboard
+
+                candidate_view = TalentCandidateView(
+                    name=candidate.name,
+                    description=self.blackboards.format(key, source),
+                    required_potential_rank=candidate.required_potential_rank,
+                    phase=int(candidate.unlock_condition.phase[-1]),
+                )
+                candidates.append(candidate_view)
+
+            talents.append(tuple(candidates))
+
+        view = self.operators[char_id] = OperatorView(
+            id=char_id,
+            name=char_data.name,
+            nation=self.teams[char_data.nation_id].power_name if char_data.get("nation_id") else None,
+            team=self.teams[char_data.team_id].power_name if char_data.get("team_id") else None,
+            number=char_data.display_number,
+            rarity=char_data.rarity[-1],
+            profession=char_data.profession,
+            class_name=class_name,
+            class_asset=images.get_image("classes", "class_" + class_name.lower()),
+            archetype_id=char_data.sub_profession_id,
+            archetype_name=self.archetypes[char_data.sub_profession_id],
+            archetype_asset=images.get_image("ui/subclass", "sub_" + char_data.sub_profession_id + "_icon"),
+            talents=tuple(talents),
+        )
+        return view
+
+
+class UserPageIndex:
+    """Id lookups of the tables shown on the user page, for a single language."""
+
+    __slots__ = (
+        "characters",
+        "exp_map",
+        "gacha_pools",
+        "items",
+        "language",
+        "modules",
+        "rarities",
+        "stages",
+        "trust_frames",
+        "voice_languages",
+    )
+
+    language: LanguageIndex
+    """Index of the same language, used for skills."""
+    items: typing.Mapping[str, models.DDict]
+    """Items by item id."""
+    gacha_pools: typing.Mapping[str, models.DDict]
+    """Gacha pools by pool id."""
+    characters: typing.Mapping[str, models.DDict]
+    """Operators by character id, including the alternative forms of Amiya."""
+    rarities: typing.Mapping[str, int]
+    """Operator rarity in stars by character id."""
+    stages: typing.Mapping[str, models.DDict]
+    """Stages by stage id."""
+    modules: typing.Mapping[str, models.DDict]
+    """Modules by module id."""
+    voice_languages: typing.Mapping[str, str]
+    """Localized voice-over language names by language id."""
+    exp_map: typing.Sequence[int]
+    """Experience needed for every player level."""
+    trust_frames: typing.Sequence[int]
+    """Trust points needed for every trust level."""
+
+    def __init__(self, language: LanguageIndex) -> None:
+        self.language = language
+        assets, server = language.assets, language.server
+
+        self.items = dict(assets.get_excel("item_table", server=server)["items"])  # type: ignore
+        self.gacha_pools = {}
+        for pool in assets.get_excel("gacha_table", server=server).gacha_pool_client:  # type: ignore
+            self.gacha_pools.setdefault(pool.gacha_pool_id, pool)  # type: ignore
+
+        self.characters = {
+            **assets.get_excel("character_table", server=server),  # type: ignore
+            **assets.get_excel("char_patch_table", server=server)["patchChars"],  # type: ignore
+        }
+        self.rarities = {char_id: int(char.rarity[-1]) for char_id, char in self.characters.items()}
+
+        self.stages = dict(assets.get_excel("stage_table", server=server).stages)  # type: ignore
+        self.modules = dict(assets.get_excel("uniequip_table", server=server)["equipDict"])  # type: ignore
+        voice_lang_types = assets.get_excel("charword_table", server=server).voice_lang_type_dict  # type: ignore
+        self.voice_languages = {lang_id: voice_lang.name for lang_id, voice_lang in voice_lang_types.items()}
+        self.exp_map = list(assets.get_excel("gamedata_const", server=server).player_exp_map)  # type: ignore
+        favor_frames = assets.get_excel("favor_table", server=server)["favor_frames"]  # type: ignore
+        self.trust_frames = [frame["data"]["favor_point"] for frame in favor_frames]
+
+    def get_trust(self, favor_point: int) -> int:
+        """Get the trust percentage of trust points."""
+        return bisect.bisect_left(self.trust_frames, favor_point)
+
+
+class GamedataIndexes:
+    """Per-language lookup indexes, built lazily and dropped whenever gamedata is reloaded."""
+
+    client: arkprts.Client
+    """Client whose assets are indexed."""
+    languages: dict[str, LanguageIndex]
+    """Already built indexes."""
+    user_pages: dict[str, UserPageIndex]
+    """Already built user page indexes."""
+    blackboards: BlackboardCache
+    """Formatted skill and talent descriptions of all languages."""
+
+    def __init__(self, client: arkprts.Client) -> None:
+        self.client = client
+        self.languages = {}
+        self.user_pages = {}
+        self.blackboards = BlackboardCache()
+
+    def __getitem__(self, server: str) -> LanguageIndex:
+        """Get the index of a language, building it if necessary."""
+        if index := self.languages.get(server):
+            return index
+
+        index = self.languages[server] = LanguageIndex(self.client.assets, server, self.blackboards)
+        return index
+
+    def user_page(self, server: str) -> UserPageIndex:
+        """Get the user page index of a language, building it if necessary."""
+        if index := self.user_pages.get(server):
+            return index
+
+        index = self.user_pages[server] = UserPageIndex(self[server])
+        return index
+
+    def rebuild(self, servers: typing.Iterable[str] = ()) -> None:
+        """Drop all indexes and eagerly build the given languages."""
+        self.languages.clear()
+        self.user_pages.clear()
+        self.blackboards.clear()
+        for server in servers:
+            self[server]
+
+    def invalidate(self, servers: typing.Iterable[str]) -> None:
+        """Drop the indexes of languages whose gamedata changed, they are rebuilt on next use."""
+        servers = set(servers)
+        if self.client.assets.default_server in servers:
+            # operators are always read from the default server
+            servers.update(self.languages)
+
+        for server in servers:
+            self.languages.pop(server, None)
+            self.user_pages.pop(server, None)
+            self.blackboards.discard(server)
@@ -0,0 +1,288 @@
+"""Pool of guest sessions shared by public requests such as searches."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import typing
+
+import aiohttp
+import arkprts
+
+from . import sessions
+
+__all__ = ("STRATEGIES", "GuestPool", "PooledSession")
+
+LOGGER: logging.Logger = logging.getLogger("arkprtserver.guests")
+
+STRATEGIES: typing.Sequence[str] = ("least-loaded", "round-robin")
+"""Ways of picking the session of a request."""
+
+UPSTREAM_ERRORS = (arkprts.errors.BaseArkprtsError, aiohttp.ClientError, asyncio.TimeoutError)
+"""Errors which count as a failure of the session."""
+
+
+class PooledSession:
+    """A guest session along with its usage counters."""
+
+    __slots__ = ("channel_uid", "errors", "failures", "in_flight", "requests", "server", "session", "token")
+
+    server: str
+    """Server of the guest account."""
+    channel_uid: str
+    """Channel uid of the guest account, used to log in again."""
+    token: str
+    """Token of the guest account, used to log in again."""
+    session: arkprts.auth.AuthSession
+    """Logged in session."""
+    requests: int
+    """Requests sent."""
+    errors: int
+    """Requests that failed."""
+    failures: int
+    """Requests that failed in a row."""
+    in_flight: int
+    """Requests being sent or waiting for the session."""
+
+    def __init__(self, server: str, channel_uid: str, token: str, session: arkprts.auth.AuthSession) -> None:
+        self.server = server
+        self.channel_uid = channel_uid
+        self.token = token
+        self.session = session
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    def stats(self) -> typing.Mapping[str, typing.Any]:
+        """Get the counters of the session."""
+        return {"uid": self.session.uid, "requests": self.requests, "errors": self.errors, "in_flight": self.in_flight}
+
+
+class GuestPool(arkprts.GuestAuth):
+    """Up to `size` guest sessions per server, requests are spread over them.
+
+    A session is quarantined right away on auth errors, or after `max_failures` failed requests in a row.
+    Quarantined sessions leave the pool and log in again in the background, the pool logs in a replacement meanwhile.
+    """
+
+    size: int
+    """Maximum amount of sessions per server."""
+    strategy: str
+    """How the session of a request is picked, see `STRATEGIES`."""
+    quarantine: float
+    """Seconds a failing session waits before logging in again, sessions with auth errors log in right away."""
+    max_failures: int
+    """Failed requests in a row after which a session is quarantined."""
+    pools: dict[str, list[PooledSession]]
+    """Sessions in use by server."""
+    quarantined: list[PooledSession]
+    """Sessions waiting to log in again."""
+    logging_in: dict[str, int]
+    """Amount of new sessions currently logging in by server."""
+    logged_in: dict[str, asyncio.Event]
+    """Set once a login of a server finishes."""
+    rotation: dict[str, int]
+    """Index of the last session picked round-robin by server."""
+    tasks: set[asyncio.Task[None]]
+    """Logins of quarantined sessions."""
+    relogins: int
+    """Quarantined sessions that logged in again."""
+
+    def __init__(
+        self,
+        size: int = 6,
+        *,
+        strategy: str = "least-loaded",
+        quarantine: float = 60,
+        max_failures: int = 3,
+        cache: typing.Any = None,
+        network: arkprts.NetworkSession | None = None,
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {', '.join(STRATEGIES)}")
+
+        super().__init__(max_sessions=size, cache=cache, network=network)
+        self.size = max(1, size)
+        self.strategy = strategy
+        self.quarantine = quarantine
+        self.max_failures = max_failures
+        self.pools = {}
+        self.quarantined = []
+        self.logging_in = {}
+        self.logged_in = {}
+        self.rotation = {}
+        self.tasks = set()
+        self.relogins = 0
+
+    async def _login(self, server: str) -> PooledSession:
+        """Log in with a cached guest account or create a new one."""
+        if server not in ("en", "jp", "kr"):
+            raise ValueError("Guest accounts are only supported on the global server.")
+
+        while cached := next((auth for auth in self.upcoming_auth if auth["server"] == server), None):
+            self.upcoming_auth.remove(cached)
+            try:
+                auth = await arkprts.Auth.from_token(
+                    server,  # type: ignore
+                    channel_uid=cached["channel_uid"],
+                    token=cached["token"],
+                    network=self.network,
+                )
+            except arkprts.errors.BaseArkprtsError as e:
+                LOGGER.warning("Dropping cached guest account %s of %s: %s", cached["channel_uid"], server, e)
+                data = list(self._load_cache())
+                with contextlib.suppress(ValueError):
+                    data.remove(cached)
+                self._save_cache(data)
+                continue
+
+            return PooledSession(server, cached["channel_uid"], cached["token"], auth.session)
+
+        auth = arkprts.YostarAuth(server, network=self.network)  # type: ignore
+        channel_uid, token = await auth.login_as_guest()
+        self._append_to_cache(server=server, channel_uid=channel_uid, token=token)  # type: ignore
+        return PooledSession(server, channel_uid, token, auth.session)
+
+    def _has_room(self, server: str) -> bool:
+        """Check whether another session of a server may log in."""
+        return len(self.pools.get(server, ())) + self.logging_in.get(server, 0) < self.size
+
+    def _notify(self, server: str) -> None:
+        """Wake up the requests waiting for a login of a server."""
+        if event := self.logged_in.pop(server, None):
+            event.set()
+
+    async def _add(self, server: str) -> PooledSession:
+        """Log in a new session and add it to the pool."""
+        self.logging_in[server] = self.logging_in.get(server, 0) + 1
+        try:
+            pooled = await self._login(server)
+            self.pools.setdefault(server, []).append(pooled)
+            LOGGER.debug("Added guest session %s for %s", pooled.session.uid, server)
+            return pooled
+        finally:
+            self.logging_in[server] -= 1
+            self._notify(server)
+
+    def _select(self, server: str) -> PooledSession | None:
+        """Pick the session of a request from the logged in ones."""
+        pool = self.pools.get(server)
+        if not pool:
+            return None
+
+        if self.strategy == "round-robin":
+            index = self.rotation[server] = (self.rotation.get(server, -1) + 1) % len(pool)
+            return pool[index]
+
+        return min(pool, key=lambda pooled: (pooled.in_flight, pooled.requests))
+
+    async def _acquire(self, server: str) -> PooledSession:
+        """Get the session of a request, logging in a new one if every session is busy."""
+        while True:
+            pooled = self._select(server)
+            if (pooled is None or pooled.in_flight) and self._has_room(server):
+                return await self._add(server)
+            if pooled is not None:
+                return pooled
+
+            # every session is still logging in
+            await self.logged_in.setdefault(server, asyncio.Event()).wait()
+
+    def _failed(self, pooled: PooledSession, error: Exception) -> None:
+        """Count a failed request and quarantine the session if it keeps failing."""
+        pooled.errors += 1
+        pooled.failures += 1
+
+        pool = self.pools.get(pooled.server, [])
+        auth_error = sessions.is_auth_error(error)
+        if pooled not in pool or (not auth_error and pooled.failures < self.max_failures):
+            return
+
+        LOGGER.warning("Quarantining guest session %s of %s: %s", pooled.session.uid, pooled.server, error)
+        pool.remove(pooled)
+        self.quarantined.append(pooled)
+        task = asyncio.create_task(self._relogin(pooled, 0 if auth_error else self.quarantine))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _relogin(self, pooled: PooledSession, delay: float) -> None:
+        """Log a quarantined session in again and put it back into the pool."""
+        try:
+            await asyncio.sleep(delay)
+            auth = await arkprts.Auth.from_token(
+                pooled.server,  # type: ignore
+                channel_uid=pooled.channel_uid,
+                token=pooled.token,
+                network=self.network,
+            )
+        except UPSTREAM_ERRORS as e:
+            LOGGER.warning("Dropping guest session %s of %s: %s", pooled.session.uid, pooled.server, e)
+            return
+        finally:
+            self.quarantined.remove(pooled)
+
+        self.relogins += 1
+        pooled.session = auth.session
+        pooled.failures = 0
+        if self._has_room(pooled.server):
+            self.pools.setdefault(pooled.server, []).append(pooled)
+            self._notify(pooled.server)
+        else:
+            # a replacement took its place, keep the account for later
+            self.upcoming_auth.append(
+                {"server": pooled.server, "channel_uid": pooled.channel_uid, "token": pooled.token},  # type: ignore
+            )
+
+    async def auth_request(
+        self,
+        endpoint: str,
+        *,
+        server: arkprts.ArknightsServer | None = None,
+        **kwargs: typing.Any,
+    ) -> typing.Any:
+        """Send an authenticated request to the game server with a pooled guest session."""
+        server = server or self.network.default_server
+        if server is None:
+            raise ValueError("No default server set.")
+
+        pooled = await self._acquire(server)
+        pooled.in_flight += 1
+        try:
+            async with pooled.session as headers:
+                pooled.requests += 1
+                data = await self.request("gs", endpoint, headers=headers, server=server, **kwargs)
+        except UPSTREAM_ERRORS as e:
+            self._failed(pooled, e)
+            raise
+        finally:
+            pooled.in_flight -= 1
+
+        pooled.failures = 0
+        return data
+
+    def clear(self) -> None:
+        """Log every session in again on its next use."""
+        for pool in self.pools.values():
+            for pooled in pool:
+                self.upcoming_auth.append(
+                    {"server": pooled.server, "channel_uid": pooled.channel_uid, "token": pooled.token},  # type: ignore
+                )
+
+        self.pools.clear()
+
+    def close(self) -> None:
+        """Stop the logins of quarantined sessions."""
+        for task in self.tasks:
+            task.cancel()
+
+    def stats(self) -> typing.Mapping[str, typing.Any]:
+        """Get the request counters of every session."""
+        return {
+            "strategy": self.strategy,
+            "size": self.size,
+            "relogins": self.relogins,
+            "servers": {server: [pooled.stats() for pooled in pool] for server, pool in self.pools.items()},
+            "quarantined": [pooled.stats() for pooled in self.quarantined],
+        }
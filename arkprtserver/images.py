@@ -0,0 +1,289 @@
+"""Image asset URLs.
+
+URLs are memoized by the arguments they were built from, as relative paths apart from the base URL of their repo,
+so changing a base URL only rebases the memoized URLs.
+"""
+
+import threading
+import typing
+import urllib.parse
+
+__all__ = (
+    "BASE_URLS",
+    "URLCache",
+    "get_asset",
+    "get_avatar",
+    "get_charavatar",
+    "get_charimage",
+    "get_charportrait",
+    "get_image",
+    "get_skill",
+    "normalize_filename",
+    "precompute_urls",
+    "set_base_urls",
+    "urls",
+)
+
+BASE_URLS: dict[str, str] = {
+    "aceship": "https://raw.githubusercontent.com/Aceship/Arknight-Images/main",
+    "yuanyan3060": "https://raw.githubusercontent.com/yuanyan3060/ArknightsGameResource/main",
+    "arknightsassets": "https://raw.githubusercontent.com/ArknightsAssets/ArknightsAssets/cn/assets/torappu/dynamicassets",
+}
+"""Base URLs of the image repos by repo name."""
+
+URLKey = tuple[typing.Any, ...]
+URLEntry = tuple[str, str, str]
+
+
+class URLCache:
+    """Asset URLs memoized by the helper and arguments they were built from.
+
+    Precomputed entries are kept until the process exits, every other entry is evicted oldest first.
+    """
+
+    maxsize: int
+    """Maximum amount of entries which were not precomputed."""
+    table: dict[URLKey, URLEntry]
+    """Precomputed URLs, repos and relative paths."""
+    memo: dict[URLKey, URLEntry]
+    """Memoized URLs, repos and relative paths in insertion order."""
+    lock: threading.Lock
+    """Guards evictions, helpers are also called from render threads."""
+    hits: int
+    """Lookups served from the cache.
+
+    Approximate, lookups also come from render threads and only evictions take the lock to keep lookups cheap.
+    """
+    misses: int
+    """Lookups that had to build the URL, approximate like `hits`."""
+
+    def __init__(self, maxsize: int = 2**16) -> None:
+        self.maxsize = maxsize
+        self.table = {}
+        self.memo = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.table) + len(self.memo)
+
+    def get(self, key: URLKey) -> typing.Optional[str]:
+        """Get a memoized URL."""
+        entry = self.table.get(key) or self.memo.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: URLKey, repo: str, path: str, *, precomputed: bool = False) -> str:
+        """Memoize the URL of a relative path in a repo."""
+        url = BASE_URLS[repo] + "/" + path
+        if precomputed:
+            self.table[key] = (url, repo, path)
+            return url
+
+        with self.lock:
+            self.memo[key] = (url, repo, path)
+            while len(self.memo) > self.maxsize:
+                del self.memo[next(iter(self.memo))]
+
+        return url
+
+    def rebase(self) -> None:
+        """Rebuild every memoized URL from the current base URLs."""
+        with self.lock:
+            for entries in (self.table, self.memo):
+                for key, (_, repo, path) in entries.items():
+                    entries[key] = (BASE_URLS[repo] + "/" + path, repo, path)
+
+    def stats(self) -> typing.Mapping[str, float]:
+        """Get the cache counters, the hit and miss counts are approximate."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "precomputed": len(self.table),
+            "size": len(self),
+        }
+
+
+urls = URLCache()
+
+
+def set_base_urls(**base_urls: str) -> None:
+    """Change the base URLs of repos by name, memoized URLs are rebased instead of dropped."""
+    unknown = set(base_urls) - set(BASE_URLS)
+    if unknown:
+        raise ValueError(f"Unknown image repos: {', '.join(sorted(unknown))}")
+
+    BASE_URLS.update({repo: url.rstrip("/") for repo, url in base_urls.items() if url})
+    urls.rebase()
+
+
+def normalize_filename(filename: str) -> str:
+    """Transform filename from the id to the asset filename."""
+    filename = filename.replace("@", "_") if "@" in filename else filename.replace("#", "_")
+    return urllib.parse.quote(filename)
+
+
+def _image_path(type: str, id: str, other_repo: bool = False) -> tuple[str, str]:
+    """Get the repo and path of an image from the Aceship or yuanyan3060 repo."""
+    return ("yuanyan3060" if other_repo else "aceship"), f"{type}/{normalize_filename(str(id))}.png"
+
+
+def _avatar_path(char_id: str, skin_id: str) -> tuple[str, str]:
+    """Get the repo and path of a character avatar."""
+    if "@" not in skin_id and skin_id.endswith("#1"):
+        skin_id = char_id
+
+    return _image_path("avatar", skin_id, True)
+
+
+def _asset_path(*paths: str, ext: str = "png") -> tuple[str, str]:
+    """Get the repo and path of an asset from the ArknightsAssets repo."""
+    path = "/".join(paths) + "." + ext if not any("." in path for path in paths) else "/".join(paths)
+    return "arknightsassets", path
+
+
+def get_image(type: str, id: str, other_repo: bool = False) -> str:
+    """Get an image from the Aceship or yuanyan3060 repo."""
+    key = ("image", type, id, other_repo)
+    if (url := urls.get(key)) is not None:
+        return url
+
+    return urls.set(key, *_image_path(type, id, other_repo))
+
+
+def get_avatar(char_id: str, skin_id: str) -> str:
+    """Get a character avatar."""
+    key = ("avatar", char_id, skin_id)
+    if (url := urls.get(key)) is not None:
+        return url
+
+    return urls.set(key, *_avatar_path(char_id, skin_id))
+
+
+def _charimage_path(char_id: str, skin_id: typing.Optional[str], lowres: bool = False) -> tuple[str, str]:
+    """Get the repo and relative path of a full character image."""
+    if not skin_id or ("@" not in skin_id and skin_id.endswith("#1")):
+        skin_id = char_id + "_1"
+
+    if lowres:
+        skin_id += "b"
+
+    return _asset_path("arts/characters", char_id, normalize_filename(skin_id))
+
+
+def _charavatar_path(char_id: str, skin_id: typing.Optional[str]) -> tuple[str, str]:
+    """Get the repo and relative path of a character avatar."""
+    if not skin_id or skin_id.endswith("#1"):
+        return _asset_path("arts/charavatars", normalize_filename(char_id))
+    if skin_id.endswith("#2"):
+        return _asset_path("arts/charavatars/elite", normalize_filename(skin_id))
+    if "@" in skin_id:
+        return _asset_path("arts/charavatars/skins", normalize_filename(skin_id))
+
+    return _asset_path("arts/charavatars", normalize_filename(char_id))
+
+
+def _charportrait_path(char_id: str, skin_id: typing.Optional[str]) -> tuple[str, str]:
+    """Get the repo and relative path of a character portrait."""
+    return _asset_path("arts/charportraits", normalize_filename((skin_id and skin_id.lower()) or char_id + "#1"))
+
+
+def _skill_path(skill_name: str) -> tuple[str, str]:
+    """Get the repo and relative path of a skill icon."""
+    skill_name = "skill_icon_" + skill_name
+    if "skcom" in skill_name:
+        return _asset_path(
+            "arts/skills",
+            skill_name,
+            skill_name + ".png",
+            skill_name + ".png",
+        )  # what the hell did I mess up
+
+    return _asset_path("arts/skills", skill_name)
+
+
+def get_charimage(char_id: str, skin_id: typing.Optional[str], *, lowres: bool = False) -> str:
+    """Get a full image of a character."""
+    key = ("charimage", char_id, skin_id, lowres)
+    if (url := urls.get(key)) is not None:
+        return url
+
+    return urls.set(key, *_charimage_path(char_id, skin_id, lowres))
+
+
+def get_charavatar(char_id: str, skin_id: typing.Optional[str]) -> str:
+    """Get a character portrait."""
+    key = ("charavatar", char_id, skin_id)
+    if (url := urls.get(key)) is not None:
+        return url
+
+    return urls.set(key, *_charavatar_path(char_id, skin_id))
+
+
+def get_charportrait(char_id: str, skin_id: typing.Optional[str]) -> str:
+    """Get a character portrait."""
+    key = ("charportrait", char_id, skin_id)
+    if (url := urls.get(key)) is not None:
+        return url
+
+    return urls.set(key, *_charportrait_path(char_id, skin_id))
+
+
+def get_skill(skill_name: str) -> str:
+    """Get a skill icon."""
+    key = ("skill", skill_name)
+    if (url := urls.get(key)) is not None:
+        return url
+
+    return urls.set(key, *_skill_path(skill_name))
+
+
+def get_asset(*paths: str, ext: str = "png") -> str:
+    """Get an asset from the ArknightsAssets repo."""
+    key = ("asset", paths, ext)
+    if (url := urls.get(key)) is not None:
+        return url
+
+    return urls.set(key, *_asset_path(*paths, ext=ext))
+
+
+def precompute_urls(
+    *,
+    characters: typing.Iterable[str] = (),
+    skills: typing.Iterable[tuple[str, typing.Optional[str]]] = (),
+    items: typing.Iterable[str] = (),
+    modules: typing.Iterable[tuple[str, str]] = (),
+) -> None:
+    """Precompute the URLs the user page, search page and api look up for gamedata ids.
+
+    Characters are character ids, their default and elite skins are precomputed while outfits are only memoized.
+    Skills are skill and icon ids, items are icon ids and modules are module ids and type icons.
+    """
+    for char_id in characters:
+        for skin_id in (char_id, char_id + "#1", char_id + "#2"):
+            urls.set(("avatar", char_id, skin_id), *_avatar_path(char_id, skin_id), precomputed=True)
+            urls.set(("image", "characters", skin_id, False), *_image_path("characters", skin_id), precomputed=True)
+
+        for skin_id in (None, char_id + "#1", char_id + "#2"):
+            urls.set(("charportrait", char_id, skin_id), *_charportrait_path(char_id, skin_id), precomputed=True)
+            urls.set(("charavatar", char_id, skin_id), *_charavatar_path(char_id, skin_id), precomputed=True)
+            urls.set(("charimage", char_id, skin_id, False), *_charimage_path(char_id, skin_id), precomputed=True)
+
+    for skill_id, icon_id in skills:
+        image_id = "skill_icon_" + (icon_id or skill_id)
+        urls.set(("image", "skills", image_id, False), *_image_path("skills", image_id), precomputed=True)
+        urls.set(("skill", icon_id or skill_id), *_skill_path(icon_id or skill_id), precomputed=True)
+
+    for icon_id in items:
+        urls.set(("image", "items", icon_id, False), *_image_path("items", icon_id), precomputed=True)
+
+    for module_id, type_icon in modules:
+        urls.set(("image", "equip/icon", module_id, False), *_image_path("equip/icon", module_id), precomputed=True)
+        urls.set(("image", "equip/type", type_icon, False), *_image_path("equip/type", type_icon), precomputed=True)
@@ -0,0 +1,168 @@
+"""Running heavy rendering and serialization off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import time
+import typing
+
+__all__ = ("LoopLagMonitor", "Offloader")
+
+T = typing.TypeVar("T")
+
+EXECUTOR_KINDS: typing.Sequence[str] = ("thread", "process")
+"""Supported executor kinds."""
+
+
+class Offloader:
+    """Runs work in an executor once it is large enough to stall the event loop.
+
+    Work which only takes picklable inputs may run in a process pool,
+    everything else (templates, models, gamedata) always runs in a thread pool.
+    """
+
+    kind: str
+    """Kind of the executor of picklable work, either thread or process."""
+    threshold: int
+    """Size from which work is offloaded, sizes are rows such as players or operators."""
+    threads: concurrent.futures.ThreadPoolExecutor
+    """Executor of work which must share memory with the app."""
+    executor: concurrent.futures.Executor
+    """Executor of picklable work."""
+    offloaded: int
+    """Jobs run in an executor."""
+    inline: int
+    """Jobs small enough to run on the event loop."""
+
+    def __init__(self, kind: str = "thread", *, workers: int | None = None, threshold: int = 20) -> None:
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind {kind!r}, expected one of {', '.join(EXECUTOR_KINDS)}")
+
+        self.kind = kind
+        self.threshold = threshold
+        self.threads = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="arkprtserver-render")
+        if kind == "process":
+            self.executor = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            self.executor = self.threads
+
+        self.offloaded = 0
+        self.inline = 0
+
+    def _should_offload(self, size: int) -> bool:
+        """Decide whether work of a size is offloaded and count it."""
+        if size < self.threshold:
+            self.inline += 1
+            return False
+
+        self.offloaded += 1
+        return True
+
+    async def run(self, func: typing.Callable[..., T], /, *args: typing.Any, size: int, **kwargs: typing.Any) -> T:
+        """Run a function with picklable arguments, in the configured executor if the work is large."""
+        if not self._should_offload(size):
+            return func(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def run_in_thread(
+        self,
+        func: typing.Callable[..., T],
+        /,
+        *args: typing.Any,
+        size: int,
+        **kwargs: typing.Any,
+    ) -> T:
+        """Run a function with arbitrary arguments, in the thread pool if the work is large."""
+        if not self._should_offload(size):
+            return func(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.threads, functools.partial(func, *args, **kwargs))
+
+    async def iterate(self, iterator: typing.Iterator[T], *, size: int) -> typing.AsyncIterator[T]:
+        """Advance an iterator, in the thread pool if the work is large."""
+        if not self._should_offload(size):
+            for item in iterator:
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        sentinel: typing.Any = object()
+        while (item := await loop.run_in_executor(self.threads, next, iterator, sentinel)) is not sentinel:
+            yield item
+
+    def shutdown(self) -> None:
+        """Stop the executors, pending work is cancelled."""
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self.executor is not self.threads:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> typing.Mapping[str, typing.Any]:
+        """Get the offload counters."""
+        return {
+            "executor": self.kind,
+            "threshold": self.threshold,
+            "offloaded": self.offloaded,
+            "inline": self.inline,
+        }
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a sleep.
+
+    Any lag is time during which every other request on the loop was stalled.
+    """
+
+    interval: float
+    """Seconds between measurements."""
+    samples: collections.deque[float]
+    """Most recent lags in seconds."""
+    max_lag: float
+    """Largest lag since startup."""
+    task: asyncio.Task[None] | None
+    """Task taking the measurements."""
+
+    def __init__(self, interval: float = 0.5, *, history: int = 240) -> None:
+        self.interval = interval
+        self.samples = collections.deque(maxlen=history)
+        self.max_lag = 0.0
+        self.task = None
+
+    async def _monitor(self) -> None:
+        """Measure the lag forever."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def start(self) -> None:
+        """Start measuring in the running event loop."""
+        if self.task is None and self.interval > 0:
+            self.task = asyncio.create_task(self._monitor())
+
+    def stop(self) -> None:
+        """Stop measuring."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def stats(self) -> typing.Mapping[str, float]:
+        """Get the lag in milliseconds over the recent history."""
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0, "last": 0.0, "mean": 0.0, "p99": 0.0, "max": self.max_lag * 1000}
+
+        return {
+            "samples": len(samples),
+            "last": self.samples[-1] * 1000,
+            "mean": sum(samples) / len(samples) * 1000,
+            "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+            "max": self.max_lag * 1000,
+        }
@@ -0,0 +1,111 @@
+"""Pre-rendered pages whose only inputs change a few times a day.
+
+Pages are rendered and compressed once per distinct input and then served as cached bytes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import typing
+
+import aiohttp.web
+import jinja2
+
+from . import cache, compression
+
+__all__ = ("PageCache", "RenderedPage")
+
+
+class RenderedPage:
+    """A rendered page along with its compressed variants."""
+
+    __slots__ = ("body", "encoded", "etag")
+
+    body: bytes
+    """Uncompressed body."""
+    encoded: typing.Mapping[str, bytes]
+    """Compressed bodies by content encoding."""
+    etag: str
+    """Strong ETag of the uncompressed body."""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.encoded = {encoding: compression.compress(body, encoding) for encoding in compression.ENCODINGS}
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+    def response(self, request: aiohttp.web.Request, *, content_type: str = "text/html") -> aiohttp.web.Response:
+        """Respond with the encoding accepted by the request or 304 if it already has the page."""
+        headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if any(etag.value == self.etag for etag in request.if_none_match or ()):
+            response = aiohttp.web.Response(status=304, headers=headers)
+            response.etag = self.etag
+            return response
+
+        encoding = compression.negotiate_encoding(request.headers.get("Accept-Encoding", ""), self.encoded)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        response = aiohttp.web.Response(
+            body=self.encoded[encoding] if encoding else self.body,
+            content_type=content_type,
+            charset="utf-8",
+            headers=headers,
+        )
+        response.etag = self.etag
+        return response
+
+
+class PageCache:
+    """Templates rendered without request context, cached until their inputs change.
+
+    Inputs are first compared by identity, so a request only compares their contents after they were replaced.
+    """
+
+    env: jinja2.Environment
+    """Environment of the templates."""
+    pages: dict[str, tuple[tuple[typing.Any, ...], RenderedPage]]
+    """Rendered pages and the inputs they were rendered from by template name."""
+    flights: cache.SingleFlight[str, RenderedPage]
+    """Renders currently in flight."""
+    hits: int
+    """Requests served from the cache."""
+    renders: int
+    """Times a page was rendered."""
+
+    def __init__(self, env: jinja2.Environment) -> None:
+        self.env = env
+        self.pages = {}
+        self.flights = cache.SingleFlight()
+        self.hits = 0
+        self.renders = 0
+
+    def _render(self, name: str) -> RenderedPage:
+        """Render and compress a page."""
+        text = self.env.get_template(name).render()
+        return RenderedPage(text.encode())
+
+    async def get(self, name: str, inputs: tuple[typing.Any, ...] = ()) -> RenderedPage:
+        """Get a rendered page, rendering it again if its inputs changed."""
+        if (entry := self.pages.get(name)) is not None:
+            cached_inputs, page = entry
+            if len(cached_inputs) == len(inputs) and all(a is b for a, b in zip(cached_inputs, inputs)):
+                self.hits += 1
+                return page
+
+            if cached_inputs == inputs:
+                self.pages[name] = (inputs, page)
+                self.hits += 1
+                return page
+
+        async def render() -> RenderedPage:
+            page = await asyncio.to_thread(self._render, name)
+            self.pages[name] = (inputs, page)
+            self.renders += 1
+            return page
+
+        return await self.flights.do(name, render)
+
+    def stats(self) -> typing.Mapping[str, float]:
+        """Get the cache counters."""
+        return {"hits": self.hits, "renders": self.renders, "pages": len(self.pages)}
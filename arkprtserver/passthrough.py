@@ -0,0 +1,132 @@
+"""Forwarding game server responses as the bytes they were received as.
+
+Large bodies are never decoded, only errors (which are small) and the members around a sliced out member are.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import typing
+
+import arkprts
+
+__all__ = ("UpstreamResponse", "auth_request", "check_errors", "slice_member")
+
+SMALL_BODY = 4096
+"""Bodies up to this size are decoded to look for errors."""
+MAX_ENVELOPE = 4096
+"""Maximum size of the members before and after a sliced member."""
+
+TOKEN_PATTERN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+"""Strings and brackets of json."""
+WHITESPACE = b" \t\r\n"
+
+
+class UpstreamResponse:
+    """A game server response along with its raw body."""
+
+    __slots__ = ("body", "data", "status")
+
+    status: int
+    """HTTP status."""
+    body: bytes
+    """Raw json body."""
+    data: typing.Any
+    """Decoded body if it is small or an error, otherwise None."""
+
+    def __init__(self, status: int, body: bytes) -> None:
+        self.status = status
+        self.body = body
+        self.data = json.loads(body) if status != 200 or len(body) <= SMALL_BODY else None
+
+    def decode(self) -> typing.Any:
+        """Decode the body."""
+        if self.data is None:
+            self.data = json.loads(self.body)
+
+        return self.data
+
+
+async def auth_request(auth: arkprts.Auth, endpoint: str, *, json: typing.Any = None) -> UpstreamResponse:
+    """Send an authenticated request to the game server without decoding the response.
+
+    Mirrors `arkprts.Auth.auth_request`, the session is locked and its seqnum incremented.
+    """
+    if not auth.session.uid:
+        raise arkprts.errors.NotLoggedInError("Not logged in.")
+
+    network = auth.network
+    if not network.domains[auth.server]:
+        await network.load_network_config(auth.server)
+
+    url = network.domains[auth.server]["gs"] + "/" + endpoint
+    async with auth.session as session_headers:
+        headers = {**arkprts.network.DEFAULT_HEADERS, **session_headers}
+        async with network.session.request("POST", url, headers=headers, json=json) as response:
+            return UpstreamResponse(response.status, await response.read())
+
+
+def check_errors(status: int, data: typing.Any) -> None:
+    """Raise the errors arkprts raises for an upstream response."""
+    if not isinstance(data, dict):
+        return
+    if data.get("error"):
+        raise arkprts.errors.GameServerError(data)
+    if status != 200:
+        raise arkprts.errors.InvalidStatusError(status, data)
+    if isinstance(data.get("result"), int) and data["result"] != 0:
+        raise arkprts.errors.ArkPrtsError(data)
+
+
+def _member_start(body: bytes, key: str) -> int | None:
+    """Find where the value of a member of the top-level object starts, only tokenizing the members before it."""
+    target = json.dumps(key).encode()
+    depth = 0
+    for match in TOKEN_PATTERN.finditer(body, 0, MAX_ENVELOPE):
+        token = match.group()
+        if token[0] == ord('"'):
+            if depth == 1 and token == target:
+                start = match.end()
+                while start < len(body) and body[start] in WHITESPACE:
+                    start += 1
+                if start < len(body) and body[start] == ord(":"):
+                    start += 1
+                    while start < len(body) and body[start] in WHITESPACE:
+                        start += 1
+                    return start
+        elif token in b"{[":
+            depth += 1
+        else:
+            depth -= 1
+
+    return None
+
+
+def slice_member(body: bytes, key: str) -> tuple[bytes, typing.Any] | None:
+    """Slice the raw value of an object or array member out of a json object.
+
+    The other members must be small, which is how the game server lays out the user data.
+    Only they are decoded, they are returned with the sliced member set to None.
+    None if the body is not laid out like that.
+    """
+    start = _member_start(body, key)
+    if start is None or body[start] not in b"{[":
+        return None
+
+    # the rest of the object only decodes with the member left out if it is cut at the end of a top-level member,
+    # never at a bracket nested inside the member or inside a string. Later members may be objects too,
+    # so every bracket near the end is tried and the earliest one wins.
+    result = None
+    end = len(body)
+    lowest = max(start, len(body) - MAX_ENVELOPE)
+    while (end := max(body.rfind(b"}", lowest, end), body.rfind(b"]", lowest, end))) != -1:
+        try:
+            data = json.loads(body[:start] + b"null" + body[end + 1 :])
+        except ValueError:
+            continue
+
+        if isinstance(data, dict) and key in data:
+            result = (body[start : end + 1], data)
+
+    return result
@@ -0,0 +1,73 @@
+"""Startup phases routes can wait for."""
+
+from __future__ import annotations
+
+import asyncio
+import typing
+
+import aiohttp.web
+
+__all__ = ("PHASES", "Readiness", "get_required_phases", "requires")
+
+PHASES: typing.Sequence[str] = ("network", "gamedata", "announcements", "banners")
+"""All startup phases in the order they usually finish."""
+
+HandlerT = typing.TypeVar("HandlerT", bound=typing.Callable[..., typing.Any])
+
+
+def requires(*phases: str) -> typing.Callable[[HandlerT], HandlerT]:
+    """Declare which startup phases a route handler needs, routes without a declaration need all of them."""
+    unknown = set(phases) - set(PHASES)
+    if unknown:
+        raise ValueError(f"Unknown startup phases: {', '.join(sorted(unknown))}")
+
+    def decorator(handler: HandlerT) -> HandlerT:
+        handler.startup_phases = phases  # type: ignore
+        return handler
+
+    return decorator
+
+
+def get_required_phases(request: aiohttp.web.Request) -> typing.Sequence[str]:
+    """Get the startup phases the handler of a request needs."""
+    match_info = request.match_info
+    if match_info.http_exception is not None:
+        return ()
+
+    return getattr(match_info.handler, "startup_phases", PHASES)
+
+
+class Readiness:
+    """Startup phases which have finished."""
+
+    events: dict[str, asyncio.Event]
+    """Events of every phase."""
+
+    def __init__(self) -> None:
+        self.events = {phase: asyncio.Event() for phase in PHASES}
+
+    def set(self, *phases: str) -> None:
+        """Mark phases as finished."""
+        for phase in phases:
+            self.events[phase].set()
+
+    def is_ready(self, phases: typing.Iterable[str] = PHASES) -> bool:
+        """Check whether all given phases have finished."""
+        return all(self.events[phase].is_set() for phase in phases)
+
+    def status(self) -> typing.Mapping[str, bool]:
+        """Get which phases have finished."""
+        return {phase: event.is_set() for phase, event in self.events.items()}
+
+    async def wait(self, phases: typing.Iterable[str] = PHASES, *, timeout: float | None = None) -> bool:
+        """Wait for phases to finish, returns False if the timeout ran out first."""
+        waiters = [self.events[phase].wait() for phase in phases if not self.events[phase].is_set()]
+        if not waiters:
+            return True
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*waiters), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        return True
@@ -0,0 +1,108 @@
+"""Serialization of api responses in the format a client asks for.
+
+Json is encoded with orjson if it is installed. MessagePack and BSON are available if msgpack or bson are installed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import typing
+
+import aiohttp.web
+
+from . import compression
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import bson
+except ImportError:
+    bson = None
+
+__all__ = ("CONTENT_TYPES", "FORMATS", "dumps_json", "encode", "etag", "negotiate_format")
+
+CONTENT_TYPES: typing.Mapping[str, str] = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "bson": "application/bson",
+}
+"""Content types by format."""
+ACCEPTED_TYPES: typing.Mapping[str, str] = {
+    **{content_type: format for format, content_type in CONTENT_TYPES.items()},
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+}
+"""Formats by the content types clients may accept them as."""
+FORMATS: typing.Sequence[str] = tuple(
+    format for format, module in (("json", json), ("msgpack", msgpack), ("bson", bson)) if module is not None
+)
+"""Formats whose encoder is installed, the first one is the default."""
+
+
+def dumps_json(data: typing.Any) -> bytes:
+    """Encode json with orjson, falling back to the standard library for data orjson rejects."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:  # integers over 64 bits
+            pass
+
+    return json.dumps(data).encode()
+
+
+def _dumps_bson(data: typing.Any) -> bytes:
+    """Encode BSON, whose top level must be a document."""
+    assert bson is not None
+    document = data if isinstance(data, typing.Mapping) else {"data": data}
+    if hasattr(bson, "encode"):  # pymongo
+        return bson.encode(document)  # type: ignore
+
+    return bson.dumps(document)  # type: ignore
+
+
+def encode(data: typing.Any, format: str = "json") -> bytes:
+    """Encode data in a format."""
+    if format == "json":
+        return dumps_json(data)
+    if format == "msgpack" and msgpack is not None:
+        return msgpack.packb(data)  # type: ignore
+    if format == "bson" and bson is not None:
+        return _dumps_bson(data)
+
+    raise ValueError(f"Unsupported format {format!r}")
+
+
+def etag(*parts: bytes | str) -> str:
+    """Hash the parts a response is made from into an ETag."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode() if isinstance(part, str) else part)
+        digest.update(b"\0")
+
+    return digest.hexdigest()[:32]
+
+
+def negotiate_format(request: aiohttp.web.Request) -> str | None:
+    """Pick the format of a response from the format param or the Accept header.
+
+    None if the format param asks for an unavailable format, an unsatisfiable Accept header falls back to json.
+    """
+    if format := request.query.get("format"):
+        return format.lower() if format.lower() in FORMATS else None
+
+    best, best_quality = FORMATS[0], 0.0
+    for media_type, quality in compression.parse_qualities(request.headers.get("Accept", "")).items():
+        format = ACCEPTED_TYPES.get(media_type)
+        if format in FORMATS and quality > best_quality:
+            best, best_quality = format, quality
+
+    return best
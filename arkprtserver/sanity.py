@@ -0,0 +1,196 @@
+"""Sanity extrapolated locally between rare game server syncs.
+
+Sanity regenerates by one every `REGEN_INTERVAL` until it reaches the maximum, so a single sync is enough to know it
+until it is spent in game.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import time
+import typing
+
+__all__ = ("REGEN_INTERVAL", "Sanity", "SanityStream", "SanityStreams")
+
+REGEN_INTERVAL = datetime.timedelta(minutes=6)
+"""Time it takes to regenerate a single sanity."""
+
+
+class Sanity:
+    """Sanity as last reported by the game server."""
+
+    __slots__ = ("ap", "last_ap_add_time", "max_ap")
+
+    ap: int
+    """Sanity at the last regeneration."""
+    max_ap: int
+    """Sanity up to which it regenerates."""
+    last_ap_add_time: datetime.datetime
+    """Time of the last regeneration."""
+
+    def __init__(self, ap: int, max_ap: int, last_ap_add_time: datetime.datetime) -> None:
+        self.ap = ap
+        self.max_ap = max_ap
+        self.last_ap_add_time = last_ap_add_time
+
+    @classmethod
+    def from_raw(cls, status: typing.Mapping[str, typing.Any]) -> Sanity:
+        """Get sanity from the raw status of a user."""
+        last_ap_add_time = datetime.datetime.fromtimestamp(status["lastApAddTime"], tz=datetime.timezone.utc)
+        return cls(status["ap"], status["maxAp"], last_ap_add_time)
+
+    def regenerated(self, now: datetime.datetime) -> int:
+        """Get the amount of sanity regenerated since the last regeneration, regardless of the maximum."""
+        return max(0, (now - self.last_ap_add_time) // REGEN_INTERVAL)
+
+    def current(self, now: datetime.datetime) -> int:
+        """Get the current sanity, sanity over the maximum does not regenerate."""
+        if self.ap >= self.max_ap:
+            return self.ap
+
+        return min(self.max_ap, self.ap + self.regenerated(now))
+
+    def next_regen(self, now: datetime.datetime) -> datetime.datetime | None:
+        """Get the time the next sanity regenerates, None if it is full."""
+        if self.current(now) >= self.max_ap:
+            return None
+
+        return self.last_ap_add_time + REGEN_INTERVAL * (self.regenerated(now) + 1)
+
+    @property
+    def full_at(self) -> datetime.datetime:
+        """Get the time sanity is full."""
+        return self.last_ap_add_time + REGEN_INTERVAL * max(0, self.max_ap - self.ap)
+
+    def to_dict(self, now: datetime.datetime) -> dict[str, typing.Any]:
+        """Get sanity as returned by the api."""
+        next_regen = self.next_regen(now)
+        return {
+            "current": self.current(now),
+            "max": self.max_ap,
+            "last": self.ap,
+            "lastupdate": self.last_ap_add_time.isoformat(),
+            "next": next_regen and next_regen.isoformat(),
+            "full": self.full_at.isoformat(),
+        }
+
+
+class SanityStream:
+    """Sanity of a single user, pushed on every regeneration and synced with the game server on an interval."""
+
+    sanity: Sanity
+    """Last synced sanity."""
+    sync: typing.Callable[[], typing.Awaitable[Sanity]]
+    """Fetches sanity from the game server."""
+    sync_interval: float
+    """Seconds between syncs."""
+    heartbeat: float
+    """Seconds after which a heartbeat is yielded if nothing changed."""
+    synced_at: float
+    """Monotonic time of the last sync."""
+    sync_requested: bool
+    """Whether the client asked for a sync."""
+    closed: bool
+    """Whether the stream was closed."""
+    wakeup: asyncio.Event
+    """Set when the stream has to stop waiting."""
+
+    def __init__(
+        self,
+        sanity: Sanity,
+        sync: typing.Callable[[], typing.Awaitable[Sanity]],
+        *,
+        sync_interval: float = 3600,
+        heartbeat: float = 30,
+    ) -> None:
+        self.sanity = sanity
+        self.sync = sync
+        self.sync_interval = sync_interval
+        self.heartbeat = heartbeat
+        self.synced_at = time.monotonic()
+        self.sync_requested = False
+        self.closed = False
+        self.wakeup = asyncio.Event()
+
+    def request_sync(self) -> None:
+        """Sync with the game server as soon as possible."""
+        self.sync_requested = True
+        self.wakeup.set()
+
+    def close(self) -> None:
+        """Stop the stream."""
+        self.closed = True
+        self.wakeup.set()
+
+    def _timeout(self, now: datetime.datetime) -> float:
+        """Get the seconds until something may have to be yielded."""
+        timeout = min(self.heartbeat, self.synced_at + self.sync_interval - time.monotonic())
+        if (next_regen := self.sanity.next_regen(now)) is not None:
+            timeout = min(timeout, (next_regen - now).total_seconds())
+
+        return max(0.0, timeout)
+
+    async def updates(self) -> typing.AsyncIterator[tuple[str, typing.Any] | None]:
+        """Yield sanity whenever it changes and ("sync", None) after every sync, None on heartbeats."""
+        yield ("sync", None)
+
+        last = None
+        while not self.closed:
+            if self.sync_requested or time.monotonic() - self.synced_at >= self.sync_interval:
+                self.sync_requested = False
+                self.sanity = await self.sync()
+                self.synced_at = time.monotonic()
+                yield ("sync", None)
+
+            now = datetime.datetime.now(tz=datetime.timezone.utc)
+            if (current := self.sanity.to_dict(now)) != last:
+                last = current
+                yield ("sanity", current)
+            else:
+                yield None
+
+            self.wakeup.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.wakeup.wait(), self._timeout(now))
+
+
+class SanityStreams:
+    """Every open sanity stream, so they can be closed on shutdown."""
+
+    sync_interval: float
+    """Seconds between syncs of new streams."""
+    heartbeat: float
+    """Seconds between heartbeats of new streams."""
+    streams: set[SanityStream]
+    """Open streams."""
+    opened: int
+    """Streams opened since startup."""
+
+    def __init__(self, *, sync_interval: float = 3600, heartbeat: float = 30) -> None:
+        self.sync_interval = sync_interval
+        self.heartbeat = heartbeat
+        self.streams = set()
+        self.opened = 0
+
+    def open(self, sanity: Sanity, sync: typing.Callable[[], typing.Awaitable[Sanity]]) -> SanityStream:
+        """Open a stream, it must be passed to `discard` once it ends."""
+        stream = SanityStream(sanity, sync, sync_interval=self.sync_interval, heartbeat=self.heartbeat)
+        self.streams.add(stream)
+        self.opened += 1
+        return stream
+
+    def discard(self, stream: SanityStream) -> None:
+        """Forget a stream that ended."""
+        stream.close()
+        self.streams.discard(stream)
+
+    def close(self) -> None:
+        """Close every open stream."""
+        for stream in self.streams:
+            stream.close()
+
+    def stats(self) -> typing.Mapping[str, float]:
+        """Get the stream counters."""
+        return {"open": len(self.streams), "opened": self.opened}
@@ -0,0 +1,159 @@
+"""Pool of logged in user sessions."""
+
+from __future__ import annotations
+
+import collections
+import time
+import typing
+
+import arkprts
+
+from . import cache
+
+__all__ = ("SessionPool", "is_auth_error")
+
+SessionKey = tuple[str, ...]
+
+AUTH_ERROR_STATUSES = frozenset((401, 403))
+"""Upstream status codes meaning the session is no longer valid."""
+
+
+def is_auth_error(data: typing.Mapping[str, typing.Any] | Exception) -> bool:
+    """Check whether an upstream response or error means the session has expired."""
+    if isinstance(data, arkprts.errors.NotLoggedInError):
+        return True
+    if isinstance(data, arkprts.errors.GameServerError):
+        return data.status_code in AUTH_ERROR_STATUSES
+    if isinstance(data, Exception):
+        return False
+
+    return bool(data.get("error")) and data.get("statusCode") in AUTH_ERROR_STATUSES
+
+
+class SessionPool:
+    """Bounded pool of live user sessions.
+
+    Sessions are keyed by both (server, channeluid, token) and (server, uid, secret),
+    so a client may keep using either the login token or the returned uid/secret/seqnum.
+    Every key of the same login shares a single Auth, which keeps the seqnum in order.
+    """
+
+    network: arkprts.NetworkSession
+    """Network session used by new sessions."""
+    maxsize: int
+    """Maximum amount of pooled keys, least recently used keys are evicted first."""
+    idle_timeout: float
+    """Seconds after which an unused session is dropped."""
+    entries: collections.OrderedDict[SessionKey, tuple[float, arkprts.Auth]]
+    """Sessions and their last use time in least recently used order."""
+    logins: cache.SingleFlight[SessionKey, arkprts.Auth]
+    """Logins currently in flight."""
+    hits: int
+    """Requests served by a pooled session."""
+    logins_count: int
+    """Full upstream logins."""
+    evictions: int
+    """Sessions dropped because of upstream auth errors."""
+
+    def __init__(self, network: arkprts.NetworkSession, *, maxsize: int = 256, idle_timeout: float = 600) -> None:
+        self.network = network
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.entries = collections.OrderedDict()
+        self.logins = cache.SingleFlight()
+        self.hits = 0
+        self.logins_count = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _get(self, key: SessionKey) -> arkprts.Auth | None:
+        """Get a live session and mark it as used."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        last_used, auth = entry
+        now = time.monotonic()
+        if now - last_used >= self.idle_timeout:
+            del self.entries[key]
+            return None
+
+        self.entries[key] = (now, auth)
+        self.entries.move_to_end(key)
+        return auth
+
+    def _set(self, key: SessionKey, auth: arkprts.Auth) -> None:
+        """Store a session, dropping idle and least recently used ones."""
+        if self.maxsize <= 0:
+            return
+
+        now = time.monotonic()
+        self.entries[key] = (now, auth)
+        self.entries.move_to_end(key)
+
+        while self.entries:
+            oldest_key, (last_used, _) = next(iter(self.entries.items()))
+            if len(self.entries) <= self.maxsize and now - last_used < self.idle_timeout:
+                break
+            del self.entries[oldest_key]
+
+    async def login_with_token(self, server: str, channel_uid: str, token: str) -> arkprts.Auth:
+        """Get a pooled session or log in with a channel uid and token."""
+        key = ("token", server, channel_uid, token)
+        if (auth := self._get(key)) is not None:
+            self.hits += 1
+            return auth
+
+        async def login() -> arkprts.Auth:
+            self.logins_count += 1
+            auth = await arkprts.Auth.from_token(
+                server,  # type: ignore
+                channel_uid=channel_uid,
+                token=token,
+                network=self.network,
+            )
+            self._set(key, auth)
+            self._set(("session", server, auth.session.uid, auth.session.secret), auth)
+            return auth
+
+        return await self.logins.do(key, login)
+
+    def from_session(self, server: str, uid: str, secret: str, seqnum: str | int) -> arkprts.Auth:
+        """Get a pooled session or resume an ongoing one."""
+        key = ("session", server, uid, secret)
+        if (auth := self._get(key)) is not None:
+            self.hits += 1
+            # the client may have sent requests without us in the meantime
+            auth.session.seqnum = max(auth.session.seqnum, int(seqnum))
+            return auth
+
+        auth = arkprts.Auth.create(server, network=self.network)  # type: ignore
+        auth.session = arkprts.auth.AuthSession(server, uid=uid, secret=secret, seqnum=int(seqnum))  # type: ignore
+        self._set(key, auth)
+        return auth
+
+    def discard(self, auth: arkprts.Auth) -> None:
+        """Drop every key of a session, for example after it has expired upstream."""
+        keys = [key for key, (_, pooled) in self.entries.items() if pooled is auth]
+        for key in keys:
+            del self.entries[key]
+
+        if keys:
+            self.evictions += 1
+
+    def check(self, auth: arkprts.Auth, data: typing.Mapping[str, typing.Any] | Exception) -> None:
+        """Drop a session if an upstream response or error means it has expired."""
+        if is_auth_error(data):
+            self.discard(auth)
+
+    def stats(self) -> typing.Mapping[str, float]:
+        """Get the pool counters."""
+        return {
+            "hits": self.hits,
+            "logins": self.logins_count,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "in_flight": len(self.logins.pending),
+        }
@@ -0,0 +1,151 @@
+"""Warm-start snapshot of the loaded gamedata."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import logging
+import marshal
+import os
+import pathlib
+import sys
+import time
+import typing
+
+import arkprts
+
+__all__ = ("Snapshot", "get_assets_version", "hash_excel_tables", "load", "load_excel_tables", "save")
+
+LOGGER: logging.Logger = logging.getLogger("arkprtserver.snapshot")
+
+SNAPSHOT_FORMAT = 2
+"""Version of the snapshot layout, older snapshots are ignored."""
+
+
+class Snapshot(typing.TypedDict):
+    """Persisted startup state."""
+
+    format: int
+    """Snapshot layout version."""
+    python: int
+    """Python version the snapshot was written with, marshal is not portable between versions."""
+    version: str
+    """Version of the downloaded gamedata."""
+    hashes: dict[tuple[str, str], str]
+    """Hashes of the table files by server and path."""
+    created: float
+    """Unix time of creation."""
+    excel: dict[str, dict[str, typing.Any]]
+    """Loaded excel tables by server and path."""
+    globals: dict[str, typing.Any]
+    """Template globals such as announcements and banner operators."""
+
+
+def get_assets_version(assets: arkprts.Assets) -> str:
+    """Get an identifier of the downloaded gamedata version."""
+    if isinstance(assets, arkprts.BundleAssets):
+        files = sorted(assets.directory.glob("*/hot_update_list.json"))
+    elif isinstance(assets, arkprts.GitAssets):
+        repositories = (arkprts.assets.git.CN_GAMEDATA_REPOSITORY, arkprts.assets.git.YOSTAR_GAMEDATA_REPOSITORY)
+        files = [assets.parent_directory / repository.split("/")[1] / "commit.txt" for repository in repositories]
+    else:
+        return ""
+
+    digest = hashlib.sha1()  # noqa: S324
+    for file in files:
+        if file.exists():
+            digest.update(file.read_bytes())
+
+    return digest.hexdigest()
+
+
+def hash_excel_tables(
+    assets: arkprts.Assets,
+    tables: typing.Mapping[str, typing.Iterable[str]],
+) -> dict[tuple[str, str], str]:
+    """Hash the files of excel tables by server and path, missing tables are left out."""
+    hashes: dict[tuple[str, str], str] = {}
+    for server, paths in tables.items():
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                hashes[server, path] = hashlib.sha1(assets.get_file(path, server=server)).hexdigest()  # type: ignore # noqa: S324
+
+    return hashes
+
+
+def load_excel_tables(
+    assets: arkprts.Assets,
+    tables: typing.Mapping[str, typing.Iterable[str]],
+) -> dict[str, dict[str, typing.Any]]:
+    """Read and parse excel tables from disk without touching the assets cache.
+
+    Tables which no longer exist are skipped, they are loaded lazily again if ever requested.
+    """
+    excel: dict[str, dict[str, typing.Any]] = {}
+    for server, paths in tables.items():
+        excel[server] = {}
+        for path in paths:
+            try:
+                excel[server][path] = assets.json_loads(assets.get_file(path, server=server))  # type: ignore
+            except FileNotFoundError:  # noqa: PERF203
+                LOGGER.warning("Table %s no longer exists for %s", path, server)
+
+    return excel
+
+
+def load(path: os.PathLike[str] | str) -> Snapshot | None:
+    """Load a snapshot, returns None if it is missing, corrupted or outdated."""
+    path = pathlib.Path(path)
+    if not path.exists():
+        return None
+
+    try:
+        snapshot: Snapshot = marshal.loads(path.read_bytes())  # noqa: S302
+    except (EOFError, ValueError, TypeError):
+        LOGGER.warning("Ignoring corrupted snapshot %s", path)
+        return None
+
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("format") != SNAPSHOT_FORMAT
+        or snapshot.get("python") != sys.hexversion >> 16
+    ):
+        LOGGER.info("Ignoring outdated snapshot %s", path)
+        return None
+
+    return snapshot
+
+
+def save(
+    path: os.PathLike[str] | str,
+    *,
+    version: str,
+    hashes: typing.Mapping[tuple[str, str], str],
+    excel: typing.Mapping[str, typing.Mapping[str, typing.Any]],
+    env_globals: typing.Mapping[str, typing.Any],
+) -> None:
+    """Atomically write a snapshot.
+
+    The given mappings must not be modified while the snapshot is being written.
+    """
+    path = pathlib.Path(path)
+    snapshot: Snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "python": sys.hexversion >> 16,
+        "version": version,
+        "hashes": dict(hashes),
+        "created": time.time(),
+        "excel": dict(excel),  # type: ignore
+        "globals": dict(env_globals),
+    }
+    try:
+        data = marshal.dumps(snapshot)
+    except ValueError:
+        LOGGER.exception("Gamedata contains unserializable values, not writing a snapshot")
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(path.name + ".tmp")
+    temporary_path.write_bytes(data)
+    temporary_path.replace(path)
+    LOGGER.info("Saved gamedata snapshot to %s (%.1fMB)", path, len(data) / 2**20)
@@ -0,0 +1,116 @@
+"""Static files served under content-hashed URLs with precompressed siblings."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mimetypes
+import pathlib
+import typing
+
+from . import compression
+
+__all__ = ("StaticFiles",)
+
+LOGGER: logging.Logger = logging.getLogger("arkprtserver.staticfiles")
+
+SIBLING_EXTENSIONS: typing.Mapping[str, str] = {"br": ".br", "gzip": ".gz"}
+"""Extensions of the precompressed siblings aiohttp serves by content encoding."""
+
+
+class StaticFiles:
+    """A copy of the static directory with content-hashed filenames and precompressed siblings.
+
+    Files are also copied under their original name, so unhashed URLs keep working.
+    """
+
+    source: pathlib.Path
+    """Directory of the original files."""
+    directory: pathlib.Path
+    """Directory the files are served from."""
+    prefix: str
+    """URL prefix the directory is served under."""
+    hashed: dict[str, str]
+    """Content-hashed paths by original path relative to the directory."""
+    immutable: frozenset[str]
+    """Content-hashed paths."""
+    min_size: int
+    """Size from which siblings are precompressed."""
+
+    def __init__(
+        self,
+        source: str | pathlib.Path,
+        directory: str | pathlib.Path,
+        *,
+        prefix: str = "/static",
+        min_size: int = 256,
+    ) -> None:
+        self.source = pathlib.Path(source)
+        self.directory = pathlib.Path(directory)
+        self.prefix = prefix
+        self.hashed = {}
+        self.immutable = frozenset()
+        self.min_size = min_size
+
+    def _write(self, path: pathlib.Path, data: bytes) -> None:
+        """Write a file unless it already has the same content."""
+        if path.is_file() and path.read_bytes() == data:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def _write_file(self, relative: pathlib.Path, data: bytes) -> None:
+        """Write a file along with its precompressed siblings."""
+        path = self.directory / relative
+        self._write(path, data)
+
+        content_type, _ = mimetypes.guess_type(path.name)
+        compressible = len(data) >= self.min_size and compression.is_compressible(content_type or "")
+        for encoding, extension in SIBLING_EXTENSIONS.items():
+            sibling = path.with_name(path.name + extension)
+            if compressible and encoding in compression.ENCODINGS:
+                self._write(sibling, compression.compress(data, encoding))
+            else:
+                sibling.unlink(missing_ok=True)
+
+    def build(self) -> None:
+        """Copy every static file under its original and content-hashed names."""
+        hashed: dict[str, str] = {}
+        for path in sorted(self.source.rglob("*")):
+            if not path.is_file():
+                continue
+
+            data = path.read_bytes()
+            relative = path.relative_to(self.source)
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed_relative = relative.with_name(f"{relative.stem}.{digest}{relative.suffix}")
+
+            self._write_file(relative, data)
+            self._write_file(hashed_relative, data)
+            hashed[relative.as_posix()] = hashed_relative.as_posix()
+
+        self.hashed = hashed
+        self.immutable = frozenset(hashed.values())
+        LOGGER.debug("Built %s static files in %s", len(hashed), self.directory)
+
+    def resolve(self, path: str) -> pathlib.Path | None:
+        """Get the file served under a path relative to the prefix, falling back to the original files.
+
+        None if there is no such file inside the directories.
+        """
+        for directory in (self.directory, self.source):
+            root = directory.resolve()
+            file = (root / path).resolve()
+            if file.is_relative_to(root) and file.is_file():
+                return file
+
+        return None
+
+    def url(self, path: str) -> str:
+        """Get the content-hashed URL of a static file."""
+        return self.prefix + "/" + self.hashed.get(path, path)
+
+    def is_immutable(self, path: str) -> bool:
+        """Check whether a path relative to the directory is content-hashed and thus never changes."""
+        return path in self.immutable
@@ -0,0 +1,361 @@
+"""View model of the user page.
+
+Everything the page shows is resolved and sorted up front so the template only emits markup.
+"""
+
+from __future__ import annotations
+
+import datetime
+import typing
+
+import arkprts
+
+from . import gamedata, images
+
+__all__ = (
+    "BannerOperatorRow",
+    "BannerRow",
+    "CharacterRow",
+    "ItemRow",
+    "ModuleRow",
+    "SkillRow",
+    "StageRow",
+    "UserPage",
+    "build_user_page",
+)
+
+
+class ItemRow(gamedata._Frozen):
+    """An owned item."""
+
+    __slots__ = ("amount", "icon", "icon_id", "id", "name")
+
+    id: str
+    """Item id."""
+    name: str
+    """Localized name."""
+    icon_id: str
+    """Icon id."""
+    icon: str | None
+    """Icon URL, None for event items without an icon."""
+    amount: int
+    """Owned amount."""
+
+
+class SkillRow(gamedata._Frozen):
+    """A skill of an owned operator."""
+
+    __slots__ = ("icon", "mastery", "mastery_icon", "name", "selected", "title", "unlocked")
+
+    name: str
+    """Name at the current skill level."""
+    title: str
+    """Name at the current skill level including masteries."""
+    icon: str
+    """Icon URL."""
+    mastery: int
+    """Mastery level."""
+    mastery_icon: str | None
+    """Mastery icon URL, None without masteries."""
+    unlocked: bool
+    """Whether the skill is unlocked."""
+    selected: bool
+    """Whether the skill is selected by default."""
+
+
+class ModuleRow(gamedata._Frozen):
+    """The equipped module of an owned operator."""
+
+    __slots__ = ("icon", "level", "name")
+
+    name: str
+    """Type name such as SWS-X."""
+    icon: str
+    """Type icon URL."""
+    level: int
+    """Module stage."""
+
+
+class CharacterRow(gamedata._Frozen):
+    """An owned operator."""
+
+    __slots__ = (
+        "avatar",
+        "elite",
+        "elite_icon",
+        "exp",
+        "favor_point",
+        "id",
+        "image",
+        "level",
+        "module",
+        "name",
+        "potential",
+        "potential_icon",
+        "skill_level",
+        "skills",
+        "starred",
+        "trust",
+        "voice_language",
+        "wiki_url",
+    )
+
+    id: str
+    """Character id."""
+    name: str
+    """Localized name."""
+    wiki_url: str
+    """arknights.wiki.gg page URL."""
+    avatar: str
+    """Avatar URL of the selected skin."""
+    image: str
+    """Full image URL of the selected skin."""
+    potential: int
+    """Potential starting at 1."""
+    potential_icon: str | None
+    """Potential icon URL, None without potentials."""
+    starred: bool
+    """Whether the operator is marked as favorite."""
+    elite: int
+    """Elite phase."""
+    elite_icon: str
+    """Elite phase icon URL."""
+    level: int
+    """Level."""
+    exp: int
+    """Experience towards the next level."""
+    trust: int
+    """Trust percentage."""
+    favor_point: int
+    """Trust points."""
+    voice_language: str
+    """Localized voice-over language name."""
+    skill_level: int
+    """Skill level."""
+    skills: tuple[SkillRow, ...]
+    """Skills in gamedata order."""
+    module: ModuleRow | None
+    """Equipped non-default module."""
+
+
+class BannerOperatorRow(gamedata._Frozen):
+    """A 6-star rate-up operator of a banner."""
+
+    __slots__ = ("avatar", "id", "name", "wiki_url")
+
+    id: str
+    """Character id."""
+    name: str
+    """Localized name."""
+    wiki_url: str
+    """arknights.wiki.gg page URL."""
+    avatar: str
+    """Avatar URL."""
+
+
+class BannerRow(gamedata._Frozen):
+    """Pulls on a banner."""
+
+    __slots__ = ("end", "id", "operators", "pulls", "start")
+
+    id: str
+    """Gacha pool id."""
+    start: str
+    """Opening date."""
+    end: str
+    """Closing date."""
+    pulls: int
+    """Amount of pulls."""
+    operators: tuple[BannerOperatorRow, ...]
+    """6-star rate-up operators."""
+
+
+class StageRow(gamedata._Frozen):
+    """A cleared stage."""
+
+    __slots__ = ("clears", "code")
+
+    code: str
+    """Stage code such as 1-7."""
+    clears: int
+    """Amount of clears."""
+
+
+class UserPage(gamedata._Frozen):
+    """Everything shown on the user page besides the player status."""
+
+    __slots__ = (
+        "banners",
+        "basic_items",
+        "characters",
+        "items",
+        "next_level_exp",
+        "secretary_name",
+        "secretary_wiki_url",
+        "stage_code",
+        "stage_name",
+        "stages",
+        "voice_language",
+    )
+
+    secretary_name: str
+    """Localized name of the assistant."""
+    secretary_wiki_url: str
+    """arknights.wiki.gg page URL of the assistant."""
+    next_level_exp: int
+    """Experience needed for the next player level."""
+    stage_code: str | None
+    """Code of the main story stage in progress, None once completed."""
+    stage_name: str | None
+    """Name of the main story stage in progress, None once completed."""
+    voice_language: str
+    """Localized global voice-over language name."""
+    basic_items: tuple[ItemRow, ...]
+    """Owned basic items such as currencies."""
+    items: tuple[ItemRow, ...]
+    """Owned inventory items."""
+    characters: tuple[CharacterRow, ...]
+    """Owned operators, favorites and the most promoted first."""
+    banners: tuple[BannerRow, ...]
+    """Banners the player has pulled on."""
+    stages: tuple[StageRow, ...]
+    """Cleared stages."""
+
+
+def get_wiki_url(name: str) -> str:
+    """Get the arknights.wiki.gg page URL of an operator."""
+    return "https://arknights.wiki.gg/wiki/" + name.replace(" ", "_")
+
+
+def _build_items(index: gamedata.UserPageIndex, inventory: typing.Mapping[str, int]) -> tuple[ItemRow, ...]:
+    """Resolve owned items, leaving out ones the player has none of."""
+    rows: list[ItemRow] = []
+    for item_id, amount in inventory.items():
+        if amount == 0:
+            continue
+
+        item = index.items[item_id]
+        icon = None if item_id.startswith("act") else images.get_image("items", item.icon_id)
+        rows.append(ItemRow(id=item_id, name=item.name, icon_id=item.icon_id, icon=icon, amount=amount))
+
+    return tuple(rows)
+
+
+def _build_character(index: gamedata.UserPageIndex, char: arkprts.models.Character) -> CharacterRow:
+    """Resolve an owned operator."""
+    name = index.characters[char.char_id].name
+
+    skills: list[SkillRow] = []
+    for skill_index, skill in enumerate(char.skills):
+        skill_data = index.language.skills[skill.skill_id]
+        title = skill_data.levels[char.main_skill_lvl - 1 + skill.specialize_level].name
+        skills.append(
+            SkillRow(
+                name=skill_data.levels[char.main_skill_lvl - 1].name,
+                title=title,
+                icon=images.get_image("skills", "skill_icon_" + (skill_data.icon_id or skill.skill_id)),
+                mastery=skill.specialize_level,
+                mastery_icon=(
+                    images.get_image("ui/rank", f"m-{skill.specialize_level}") if skill.specialize_level else None
+                ),
+                unlocked=skill.unlock,
+                selected=char.default_skill_index == skill_index,
+            ),
+        )
+
+    module = None
+    if char.current_equip and "001" not in char.current_equip:
+        module_data = index.modules[char.current_equip]
+        module_name = module_data.type_name_1 + "-" + module_data.type_name_2
+        module = ModuleRow(
+            name=module_name,
+            icon=images.get_image("equip/type", module_name.lower()),
+            level=char.equip[char.current_equip].level,
+        )
+
+    return CharacterRow(
+        id=char.char_id,
+        name=name,
+        wiki_url=get_wiki_url(name),
+        avatar=images.get_avatar(char.char_id, char.skin),
+        image=images.get_image("characters", char.skin),
+        potential=char.potential_rank + 1,
+        potential_icon=images.get_image("ui/potential", char.potential_rank + 1) if char.potential_rank else None,
+        starred=char.star_mark,
+        elite=char.evolve_phase,
+        elite_icon=images.get_image("ui/elite", char.evolve_phase),
+        level=char.level,
+        exp=char.exp,
+        trust=index.get_trust(char.favor_point),
+        favor_point=char.favor_point,
+        voice_language=index.voice_languages[char.voice_lan],
+        skill_level=char.main_skill_lvl,
+        skills=tuple(skills),
+        module=module,
+    )
+
+
+def _build_banner(
+    index: gamedata.UserPageIndex,
+    banner_id: str,
+    pulls: int,
+    banner_operators: typing.Mapping[str, typing.Sequence[str]],
+) -> BannerRow:
+    """Resolve pulls on a banner."""
+    pool = index.gacha_pools[banner_id]
+    operators = tuple(
+        BannerOperatorRow(
+            id=char_id,
+            name=index.characters[char_id].name,
+            wiki_url=get_wiki_url(index.characters[char_id].name),
+            avatar=images.get_avatar(char_id, char_id),
+        )
+        for char_id in banner_operators.get(banner_id) or ()
+        if index.rarities[char_id] == 6
+    )
+    return BannerRow(
+        id=banner_id,
+        start=datetime.datetime.fromtimestamp(pool.open_time).strftime("%Y-%m-%d"),  # noqa: DTZ006
+        end=datetime.datetime.fromtimestamp(pool.end_time).strftime("%Y-%m-%d"),  # noqa: DTZ006
+        pulls=pulls,
+        operators=operators,
+    )
+
+
+def build_user_page(
+    user: arkprts.models.User,
+    index: gamedata.UserPageIndex,
+    banner_operators: typing.Mapping[str, typing.Sequence[str]],
+) -> UserPage:
+    """Resolve and sort everything shown on the user page."""
+    status = user.status
+    secretary_name = index.characters[status.secretary].name
+    stage = index.stages[status.main_stage_progress] if status.main_stage_progress else None
+
+    chars = sorted(
+        user.troop.chars.values(),
+        key=lambda char: (char.star_mark, char.evolve_phase, char.level),
+        reverse=True,
+    )
+    stages = tuple(
+        StageRow(code=index.stages[stage.stage_id].code, clears=stage.complete_times)
+        for stage in user.dungeon.stages.values()
+        if "#" not in stage.stage_id and stage.complete_times > 0
+    )
+
+    return UserPage(
+        secretary_name=secretary_name,
+        secretary_wiki_url=get_wiki_url(secretary_name),
+        next_level_exp=index.exp_map[status.level - 2],
+        stage_code=stage.code if stage else None,
+        stage_name=stage.name if stage else None,
+        voice_language=index.voice_languages[status.global_voice_lan or "EN"],
+        basic_items=_build_items(index, status.basic_item_inventory),
+        items=_build_items(index, user.inventory),
+        characters=tuple(_build_character(index, char) for char in chars),
+        banners=tuple(
+            _build_banner(index, banner_id, banner.cnt, banner_operators)
+            for banner_id, banner in user.gacha.normal.items()
+        ),
+        stages=stages,
+    )
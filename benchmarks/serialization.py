@@ -0,0 +1,70 @@
+"""Benchmark of encoding raw user data in every response format.
+
+Compares the formats of the shared response helper against `json.dumps` as used by `aiohttp.web.json_response`.
+Uses the downloaded gamedata of the app, run with `python -m benchmarks.serialization`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import pathlib
+import statistics
+import time
+import typing
+
+from arkprtserver import app, responses
+
+from . import user_page
+
+
+def encode_json_response(data: typing.Any) -> bytes:
+    """Encode data the way `aiohttp.web.json_response` does."""
+    return json.dumps(data).encode()
+
+
+def measure(func: typing.Callable[[], bytes], repeat: int) -> list[float]:
+    """Measure how many milliseconds each call takes."""
+    func()
+    times: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+
+    return times
+
+
+def main(repeat: int = 20, user_path: str | None = None) -> None:
+    """Encode the raw user data of a large account in every available format."""
+    assets = app.client.assets
+    if user_path:
+        data = json.loads(pathlib.Path(user_path).read_text())
+    else:
+        if not assets.loaded:
+            asyncio.run(assets.update_assets())
+
+        data = user_page.make_user_data(assets)
+
+    encoders: dict[str, typing.Callable[[], bytes]] = {"json_response": lambda: encode_json_response(data)}
+    for format in responses.FORMATS:
+        encoders[format] = lambda format=format: responses.encode(data, format)
+
+    print(f"orjson {'enabled' if responses.orjson is not None else 'not installed'}")  # noqa: T201
+    for name, func in encoders.items():
+        times = measure(func, repeat)
+        body = func()
+        print(  # noqa: T201
+            f"{name:>14}: median {statistics.median(times):8.2f}ms, min {min(times):8.2f}ms, "
+            f"{len(body) / 1024:8.0f}KB ({len(gzip.compress(body, 6)) / 1024:.0f}KB gzipped)",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20, help="encodes per format")
+    parser.add_argument("--user", help="raw user data as returned by /api/raw/user instead of a generated account")
+    args = parser.parse_args()
+    main(args.repeat, args.user)
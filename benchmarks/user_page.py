@@ -0,0 +1,214 @@
+"""Benchmark of rendering the user page of a large account.
+
+Compares the view model against the previous template, which resolved gamedata inside jinja.
+Uses the downloaded gamedata of the app, run with `python -m benchmarks.user_page`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import pathlib
+import statistics
+import time
+import typing
+
+import arkprts
+
+from arkprtserver import app, userpage
+
+LEGACY_TEMPLATE = pathlib.Path(__file__).with_name("user_legacy.html.j2")
+"""The user page template before the view model."""
+
+
+def make_character(
+    inst_id: int,
+    char_id: str,
+    char: typing.Mapping[str, typing.Any],
+    assets: arkprts.Assets,
+) -> typing.Any:
+    """Make a raw owned operator, promoted as far as its rarity allows."""
+    rarity = int(str(char["rarity"])[-1])
+    elite = min(2, max(0, rarity - 2))
+    skills: list[typing.Any] = []
+    for skill in char.get("skills") or ():
+        if not skill.get("skillId"):
+            continue
+
+        levels = len(assets.get_excel("skill_table")[skill["skillId"]]["levels"])
+        skills.append(
+            {
+                "skillId": skill["skillId"],
+                "unlock": 1,
+                "state": 0,
+                "specializeLevel": 3 if elite == 2 and levels >= 10 else 0,
+                "completeUpgradeTime": -1,
+            },
+        )
+
+    equip_ids = assets.get_excel("uniequip_table").get("charEquip", {}).get(char_id, [])
+    return {
+        "instId": inst_id,
+        "charId": char_id,
+        "favorPoint": 25570,
+        "potentialRank": inst_id % 6,
+        "mainSkillLvl": 7 if elite else 4,
+        "skin": char_id + ("#2" if elite == 2 else "#1"),
+        "level": 30 + 10 * rarity,
+        "exp": inst_id % 3 * 100,
+        "evolvePhase": elite,
+        "defaultSkillIndex": 0 if skills else -1,
+        "skills": skills,
+        "voiceLan": "JP",
+        "currentEquip": equip_ids[-1] if equip_ids else None,
+        "equip": {equip_id: {"hide": 0, "locked": 0, "level": 3} for equip_id in equip_ids},
+        "starMark": inst_id % 7 == 0,
+    }
+
+
+def make_user_data(assets: arkprts.Assets) -> typing.Any:
+    """Make raw data of an account owning every operator, item and banner and having cleared every stage."""
+    character_table = assets.get_excel("character_table")
+    chars = [
+        (char_id, char)
+        for char_id, char in character_table.items()
+        if char_id.startswith("char_") and char["profession"] not in ("TOKEN", "TRAP")
+    ]
+    now = int(time.time())
+    return {
+        "status": {
+            "nickName": "Doctor",
+            "nickNumber": "1234",
+            "level": 120,
+            "exp": 0,
+            "socialPoint": 2000,
+            "gachaTicket": 10,
+            "tenGachaTicket": 1,
+            "instantFinishTicket": 30,
+            "hggShard": 300,
+            "lggShard": 9000,
+            "recruitLicense": 200,
+            "progress": 0,
+            "buyApRemainTimes": 0,
+            "apLimitUpFlag": 0,
+            "uid": "12345678",
+            "flags": {},
+            "ap": 100,
+            "maxAp": 135,
+            "payDiamond": 0,
+            "freeDiamond": 500,
+            "diamondShard": 10000,
+            "gold": 5000000,
+            "practiceTicket": 5,
+            "lastRefreshTs": now,
+            "lastApAddTime": now,
+            "lastOnlineTs": now,
+            "mainStageProgress": None,
+            "registerTs": now - 86400 * 1500,
+            "serverName": "Terra",
+            "avatarId": "0",
+            "resume": "",
+            "friendNumLimit": 50,
+            "secretary": chars[0][0],
+            "secretarySkinId": chars[0][0] + "#1",
+            "globalVoiceLan": "JP",
+        },
+        "troop": {
+            "curCharInstId": len(chars) + 1,
+            "curSquadCount": 4,
+            "squads": {},
+            "chars": {
+                str(inst_id): make_character(inst_id, char_id, char, assets)
+                for inst_id, (char_id, char) in enumerate(chars, 1)
+            },
+            "charGroup": {char_id: {"favorPoint": 25570} for char_id, _ in chars},
+            "charMission": {},
+        },
+        "skin": {"characterSkins": {}},
+        "social": {"assistCharList": [], "yesterdayReward": {}, "yCrisisSs": "", "yCrisisV2Ss": ""},
+        "inventory": dict.fromkeys(assets.get_excel("item_table")["items"], 100),
+        "dungeon": {
+            "stages": {
+                stage_id: {
+                    "stageId": stage_id,
+                    "completeTimes": 10,
+                    "startTimes": 10,
+                    "practiceTimes": 0,
+                    "state": 3,
+                    "hasBattleReplay": 0,
+                    "noCostCnt": 0,
+                }
+                for stage_id in assets.get_excel("stage_table")["stages"]
+            },
+        },
+        "gacha": {
+            "newbee": {"openFlag": 0, "cnt": 0, "poolId": ""},
+            "normal": {
+                pool["gachaPoolId"]: {"cnt": 100, "maxCnt": 10, "rarity": 6, "avail": True}
+                for pool in assets.get_excel("gacha_table")["gachaPoolClient"]
+            },
+            "limit": {},
+            "fesClassic": {},
+        },
+    }
+
+
+def make_banner_operators(assets: arkprts.Assets) -> dict[str, list[str]]:
+    """Give every banner a few rate-up operators."""
+    operators = [
+        char_id for char_id, char in assets.get_excel("character_table").items() if str(char["rarity"])[-1] in "56"
+    ]
+    pools = assets.get_excel("gacha_table")["gachaPoolClient"]
+    return {pool["gachaPoolId"]: operators[i % len(operators) :][:4] for i, pool in enumerate(pools)}
+
+
+def measure(func: typing.Callable[[], str], repeat: int) -> list[float]:
+    """Measure how many milliseconds each call takes."""
+    func()  # warm up the indexes and template caches
+    times: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+
+    return times
+
+
+def main(repeat: int = 20, user_path: str | None = None) -> None:
+    """Render the user page of a large account with both templates."""
+    assets = app.client.assets
+    if not assets.loaded:
+        asyncio.run(assets.update_assets())
+
+    data = json.loads(pathlib.Path(user_path).read_text()) if user_path else make_user_data(assets)
+    user = arkprts.models.User(client=app.client, **data)
+    banner_operators = make_banner_operators(assets)
+    app.env.globals["banneroperators"] = banner_operators
+
+    legacy_template = app.env.from_string(LEGACY_TEMPLATE.read_text())
+    template = app.env.get_template("user.html.j2")
+    index = app.indexes.user_page(assets.default_server or "en")
+
+    def render_legacy() -> str:
+        return legacy_template.render(user=user)
+
+    def render_view_model() -> str:
+        page = userpage.build_user_page(user, index, banner_operators)
+        return template.render(user=user, page=page)
+
+    chars, items, banners = len(user.troop.chars), len(user.inventory), len(user.gacha.normal)
+    print(f"{chars} operators, {items} items, {banners} banners")  # noqa: T201
+    for name, func in (("legacy template", render_legacy), ("view model", render_view_model)):
+        times = measure(func, repeat)
+        print(  # noqa: T201
+            f"{name:>16}: median {statistics.median(times):8.2f}ms, min {min(times):8.2f}ms ({len(func()) / 1024:.0f}KB)",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20, help="renders per variant")
+    parser.add_argument("--user", help="raw user data as returned by /api/raw/user instead of a generated account")
+    args = parser.parse_args()
+    main(args.repeat, args.user)